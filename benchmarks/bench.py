@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [BENCHMARKS, os.path.join(os.path.dirname(BENCHMARKS), "src")]
+
+# pylint: disable=wrong-import-position
+import nuke
+
+import relight_node
+from relight.model import category_knobs
+from relight.model.spec import INPUT_NAME, STATE_KNOB
+from relight_manager import Manager
+
+SIZES = [1, 10, 50, 200]
+BACKGROUND_NODES = 10000
+BACKGROUND_CHAIN = 100
+BASELINES = os.path.join(BENCHMARKS, "baselines.json")
+SOURCE = "aovs"
+TIME_FACTOR = 3.0
+TIME_SLACK = 0.02
+CALL_FACTOR = 1.1
+CALL_SLACK = 10
+
+Result = Dict[str, object]
+
+
+def layer_names(count: int) -> List[str]:
+    return [f"light_{index:03d}" for index in range(count)]
+
+
+def setup(count: int) -> None:
+    nuke.reset()
+    for name in layer_names(count):
+        nuke.Layer(name, ["red", "green", "blue", "alpha"])
+    nuke.nodes.Read(name=SOURCE)
+
+
+def add_background(group: nuke.Node, count: int) -> None:
+    # The rig scans the group's nodes, so the clutter lives inside the group,
+    # in chains hanging off the input like a user's utility branches.
+    with group:
+        input_node = nuke.toNode(INPUT_NAME)
+        node = input_node
+        for index in range(count):
+            if not index % BACKGROUND_CHAIN:
+                node = input_node
+            background_node = nuke.nodes.NoOp(name=f"background{index}")
+            background_node.setInput(0, node)
+            node = background_node
+
+
+def measure(operation: Callable[[], object]) -> Result:
+    nuke.calls.clear()
+    start = time.perf_counter()
+    operation()
+    seconds = time.perf_counter() - start
+    return {"time": round(seconds, 6), "calls": dict(sorted(nuke.calls.items()))}
+
+
+def click(group: nuke.Node, operation: Callable[[], object]) -> Callable[[], object]:
+    def run() -> object:
+        nuke.set_this(group)
+        with group:
+            return operation()
+
+    return run
+
+
+def run_size(count: int, background: int = BACKGROUND_NODES) -> Dict[str, Result]:
+    names = layer_names(count)
+    results = {}
+    setup(count)
+    results["create"] = measure(relight_node.create)
+    group = nuke.allNodes("Group", group=nuke.root())[0]
+    group.setInput(0, nuke.toNode(SOURCE))
+    add_background(group, background)
+    results["refresh_layer"] = measure(lambda: relight_node.refresh_layer(group))
+    click(group, lambda: Manager().add_categories_button(names[:-1]))()
+
+    results["add_category"] = measure(
+        click(group, lambda: Manager().add_category(names[-1]))
+    )
+    results["Manager"] = measure(click(group, Manager))
+    # Without a saved state the Manager scans every node of the group.
+    saved_state = group[STATE_KNOB].value()
+    group[STATE_KNOB].setValue("")
+    results["Manager_scan"] = measure(click(group, Manager))
+    group[STATE_KNOB].setValue(saved_state)
+    category = click(group, lambda: Manager().elements[names[-1]])()
+    results["category_knobs.add"] = measure(
+        click(group, lambda: category_knobs.add(names[-1], group, category))
+    )
+    results["category_knobs.remove"] = measure(
+        click(group, lambda: category_knobs.remove(names[-1], group))
+    )
+    results["remove_cateogry"] = measure(
+        click(group, lambda: Manager().remove_cateogry(names[0]))
+    )
+    results["reset_button"] = measure(click(group, lambda: Manager().reset_button()))
+    return results
+
+
+def run(sizes: Sequence[int], background: int = BACKGROUND_NODES) -> Dict[str, Dict]:
+    return {str(count): run_size(count, background) for count in sizes}
+
+
+def compare(results: Dict[str, Dict], baselines: Dict[str, Dict]) -> List[str]:
+    regressions = []
+    for size, operations in results.items():
+        for operation, result in operations.items():
+            baseline = baselines.get(size, {}).get(operation)
+            if baseline is None:
+                continue
+            calls = sum(result["calls"].values())
+            baseline_calls = sum(baseline["calls"].values())
+            if calls > baseline_calls * CALL_FACTOR + CALL_SLACK:
+                regressions.append(
+                    f"{operation} at {size}: {calls} nuke calls, "
+                    f"baseline {baseline_calls}"
+                )
+            if result["time"] > baseline["time"] * TIME_FACTOR + TIME_SLACK:
+                regressions.append(
+                    f"{operation} at {size}: {result['time']:.4f}s, "
+                    f"baseline {baseline['time']:.4f}s"
+                )
+    return regressions
+
+
+def report(results: Dict[str, Dict]) -> None:
+    print(f"{'operation':<24}{'size':>6}{'seconds':>12}{'nuke calls':>12}")
+    for size, operations in results.items():
+        for operation, result in operations.items():
+            calls = sum(Counter(result["calls"]).values())
+            print(f"{operation:<24}{size:>6}{result['time']:>12.4f}{calls:>12}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark relight on a fake nuke.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--background", type=int, default=BACKGROUND_NODES)
+    parser.add_argument("--update", action="store_true", help="store new baselines")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.background)
+    report(results)
+    if args.update:
+        with open(BASELINES, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=1, sort_keys=True)
+            file.write("\n")
+        return 0
+    if not os.path.exists(BASELINES):
+        return 0
+    with open(BASELINES, encoding="utf-8") as file:
+        regressions = compare(results, json.load(file))
+    for regression in regressions:
+        print(f"regression: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,577 @@
+# In-memory stand-in for the parts of the nuke module used by relight.
+# It keeps a node graph, knobs and layers and counts every API call in `calls`.
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+calls: Counter = Counter()
+
+GUI = False
+
+INVISIBLE = 0x400
+READ_ONLY = 0x10000000
+STARTLINE = 0x1000
+TABBEGINGROUP = -1
+TABENDGROUP = -2
+
+DEFAULT_LAYERS = {
+    "rgba": ["red", "green", "blue", "alpha"],
+    "rgb": ["red", "green", "blue"],
+    "alpha": ["alpha"],
+}
+
+
+def _color(value: float) -> List[float]:
+    return [value] * 4
+
+
+def _color_correct() -> Dict[str, Any]:
+    knobs: Dict[str, Any] = {"lookup": "", "mix": 1.0, "channels": "rgb"}
+    for range_ in ("", "shadows.", "midtones.", "highlights."):
+        for name in ("saturation", "contrast", "gamma", "gain", "offset"):
+            knobs[range_ + name] = _color(0.0 if name == "offset" else 1.0)
+    return knobs
+
+
+NODE_DEFAULTS: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "ColorCorrect": _color_correct,
+    "Crop": lambda: {"box": [0, 0, 0, 0], "reformat": False, "crop": True},
+    "CurveTool": lambda: {"operation": "Avg Intensities", "autocropdata": _color(0)},
+    "Grade": lambda: {
+        "blackpoint": _color(0.0),
+        "whitepoint": _color(1.0),
+        "black": _color(0.0),
+        "white": _color(1.0),
+        "multiply": _color(1.0),
+        "add": _color(0.0),
+        "gamma": _color(1.0),
+        "black_clamp": True,
+        "white_clamp": False,
+        "mix": 1.0,
+        "channels": "rgb",
+    },
+    "Merge2": lambda: {
+        "operation": "over",
+        "mix": 1.0,
+        "bbox": "union",
+        "Achannels": "rgba",
+        "Bchannels": "rgba",
+        "output": "rgba",
+    },
+    "Reformat": lambda: {
+        "type": "to format",
+        "scale": [1.0, 1.0],
+        "format": "",
+        "box_width": 0,
+        "box_height": 0,
+        "box_fixed": False,
+        "resize": "width",
+    },
+    "Shuffle2": lambda: {"in1": "rgba", "out1": "rgba"},
+    "Switch": lambda: {"which": 0},
+}
+NODE_KNOBS = (
+    "name",
+    "xpos",
+    "ypos",
+    "disable",
+    "label",
+    "knobChanged",
+    "onCreate",
+    "onDestroy",
+)
+CLASS_ALIAS = {"Merge": "Merge2"}
+
+
+class Knob:
+    def __init__(self, name: str, label: Optional[str] = None, value: Any = None):
+        self._name = name
+        self._label = label if label is not None else name
+        self._value = value
+        self._flags = 0
+        self._expression: Optional[str] = None
+        self._link = ""
+        self._values: List[str] = []
+        self._node: Optional["Node"] = None
+
+    def name(self) -> str:
+        return self._name
+
+    def label(self) -> str:
+        return self._label
+
+    def setLabel(self, label: str) -> None:
+        self._label = label
+
+    def node(self) -> Optional["Node"]:
+        return self._node
+
+    def value(self, index: Optional[int] = None) -> Any:
+        if index is not None and isinstance(self._value, list):
+            return self._value[index]
+        return self._value
+
+    getValue = value
+
+    def setValue(self, value: Any, index: Optional[int] = None) -> bool:
+        calls["setValue"] += 1
+        if index is not None and isinstance(self._value, list):
+            self._value[index] = value
+        elif isinstance(self._value, list) and not isinstance(value, (list, tuple)):
+            self._value = [value] * len(self._value)
+        else:
+            self._value = list(value) if isinstance(value, tuple) else value
+        return True
+
+    def arraySize(self) -> int:
+        return len(self._value) if isinstance(self._value, list) else 1
+
+    def setFlag(self, flag: int) -> None:
+        self._flags |= flag
+
+    def clearFlag(self, flag: int) -> None:
+        self._flags &= ~flag
+
+    def getFlag(self, flag: int) -> bool:
+        return bool(self._flags & flag)
+
+    def setVisible(self, visible: bool) -> None:
+        if visible:
+            self.clearFlag(INVISIBLE)
+        else:
+            self.setFlag(INVISIBLE)
+
+    def setTooltip(self, tool_tip: str) -> None:
+        pass
+
+    def setExpression(self, expression: str, channel: int = -1) -> bool:
+        calls["setExpression"] += 1
+        self._expression = expression
+        return True
+
+    def clearAnimated(self, *args: Any) -> None:
+        self._expression = None
+
+    def hasExpression(self, *args: Any) -> bool:
+        return self._expression is not None
+
+    def isAnimated(self, *args: Any) -> bool:
+        return self._expression is not None
+
+    def animations(self) -> List[Any]:
+        return [self._expression]
+
+    def copyAnimations(self, animations: Sequence[Any]) -> None:
+        self._expression = animations[0] if animations else None
+
+    def values(self) -> List[str]:
+        return list(self._values)
+
+    def setValues(self, values: Sequence[str]) -> None:
+        self._values = list(values)
+
+    def setLink(self, link: str) -> None:
+        self._link = link
+
+    def getLink(self) -> str:
+        return self._link
+
+
+class Tab_Knob(Knob):
+    def __init__(self, name: str, label: Optional[str] = None, kind: int = 0):
+        super().__init__(name, label, kind)
+
+
+class Text_Knob(Knob):
+    pass
+
+
+class PyScript_Knob(Knob):
+    pass
+
+
+class String_Knob(Knob):
+    def __init__(self, name: str, label: Optional[str] = None, value: str = ""):
+        super().__init__(name, label, value)
+
+
+class Multiline_Eval_String_Knob(String_Knob):
+    pass
+
+
+class Boolean_Knob(Knob):
+    def __init__(self, name: str, label: Optional[str] = None, value: bool = False):
+        super().__init__(name, label, value)
+
+
+class Int_Knob(Knob):
+    def __init__(self, name: str, label: Optional[str] = None, value: int = 0):
+        super().__init__(name, label, value)
+
+
+class Double_Knob(Knob):
+    def __init__(self, name: str, label: Optional[str] = None, value: float = 0.0):
+        super().__init__(name, label, value)
+
+    def setRange(self, minimum: float, maximum: float) -> None:
+        pass
+
+
+class Link_Knob(Knob):
+    def _target(self) -> Optional[Knob]:
+        node_name, _, knob_name = self._link.rpartition(".")
+        if not node_name or self._node is None:
+            return None
+        node = self._node._children.get(node_name)
+        return None if node is None else node.knob(knob_name)
+
+    def value(self, index: Optional[int] = None) -> Any:
+        target = self._target()
+        return None if target is None else target.value(index)
+
+    def setValue(self, value: Any, index: Optional[int] = None) -> bool:
+        target = self._target()
+        return target is not None and target.setValue(value, index)
+
+
+class Enumeration_Knob(Knob):
+    def __init__(
+        self, name: str, label: Optional[str] = None, values: Sequence[str] = ()
+    ):
+        super().__init__(name, label, values[0] if values else "")
+        self._values = list(values)
+
+    def setValues(self, values: Sequence[str]) -> None:
+        self._values = list(values)
+        if not self._value in self._values:
+            self._value = self._values[0] if self._values else ""
+
+
+class CascadingEnumeration_Knob(Enumeration_Knob):
+    pass
+
+
+class Node:
+    def __init__(self, cls: str, name: Optional[str] = None, **knobs: Any) -> None:
+        calls["createNode"] += 1
+        self._class = CLASS_ALIAS.get(cls, cls)
+        self._parent: Optional[Node] = _context[-1] if _context else None
+        self._children: Dict[str, Node] = {}
+        self._inputs: List[Optional[Node]] = []
+        self._knobs: Dict[str, Knob] = {}
+        self._order: List[Knob] = []
+        self._alive = True
+        self._x = 0
+        self._y = 0
+        for knob_name in NODE_KNOBS:
+            self._add(Knob(knob_name, value=False if knob_name == "disable" else ""))
+        for knob_name, value in NODE_DEFAULTS.get(self._class, dict)().items():
+            self._add(Knob(knob_name, value=value))
+        if self._parent is not None:
+            name = self._parent._unique_name(name, self._class)
+            self._parent._children[name] = self
+        self._knobs["name"]._value = name or self._class
+        for knob_name, value in knobs.items():
+            if knob_name in self._knobs:
+                self._knobs[knob_name].setValue(value)
+
+    def __repr__(self) -> str:
+        return f"<{self._class} {self._knobs['name']._value}>"
+
+    def _add(self, knob: Knob) -> None:
+        knob._node = self
+        self._knobs.setdefault(knob.name(), knob)
+        self._order.append(knob)
+
+    def _unique_name(self, name: Optional[str], cls: str) -> str:
+        if name and not name in self._children:
+            return name
+        number = 1
+        while f"{cls}{number}" in self._children:
+            number += 1
+        return f"{cls}{number}"
+
+    def _check(self) -> None:
+        if not self._alive:
+            raise ValueError("A PythonObject is not attached to a node")
+
+    def name(self) -> str:
+        self._check()
+        return self._knobs["name"]._value
+
+    def fullName(self) -> str:
+        self._check()
+        if self._parent is None or self._parent._parent is None:
+            return self.name()
+        return f"{self._parent.fullName()}.{self.name()}"
+
+    def Class(self) -> str:
+        return self._class
+
+    def xpos(self) -> int:
+        self._check()
+        return self._x
+
+    def ypos(self) -> int:
+        self._check()
+        return self._y
+
+    def setXpos(self, x: int) -> None:
+        self._check()
+        calls["setXpos"] += 1
+        self._x = x
+
+    def setYpos(self, y: int) -> None:
+        self._check()
+        calls["setYpos"] += 1
+        self._y = y
+
+    def setXYpos(self, x: int, y: int) -> None:
+        self._check()
+        calls["setXYpos"] += 1
+        self._x = x
+        self._y = y
+
+    def setInput(self, index: int, node: Optional["Node"]) -> bool:
+        self._check()
+        calls["setInput"] += 1
+        while len(self._inputs) <= index:
+            self._inputs.append(None)
+        self._inputs[index] = node
+        return True
+
+    def input(self, index: int) -> Optional["Node"]:
+        self._check()
+        calls["input"] += 1
+        node = self._inputs[index] if index < len(self._inputs) else None
+        return node if node is not None and node._alive else None
+
+    def inputs(self) -> int:
+        self._check()
+        while self._inputs and not (self._inputs[-1] and self._inputs[-1]._alive):
+            self._inputs.pop()
+        return len(self._inputs)
+
+    def channels(self) -> List[str]:
+        self._check()
+        calls["channels"] += 1
+        owner = self._parent if self._class == "Input" else self
+        source = None if owner is None else owner.input(0)
+        if source is not None:
+            return source.channels()
+        if self._class != "Read":
+            return []
+        return [f"{layer}.{channel}" for layer in _layers for channel in _layers[layer]]
+
+    def dependent(self, *args: Any, **kwargs: Any) -> List["Node"]:
+        self._check()
+        calls["dependent"] += 1
+        return [
+            node
+            for node in self._parent._children.values()
+            if any(input_node is self for input_node in node._inputs)
+        ]
+
+    def knob(self, name: Any) -> Optional[Knob]:
+        self._check()
+        calls["knob"] += 1
+        if isinstance(name, int):
+            return self._order[name]
+        return self._knobs.get(name)
+
+    def __getitem__(self, name: str) -> Knob:
+        knob = self.knob(name)
+        if knob is None:
+            raise NameError(name)
+        return knob
+
+    def knobs(self) -> Dict[str, Knob]:
+        self._check()
+        calls["knobs"] += 1
+        return dict(self._knobs)
+
+    def allKnobs(self) -> List[Knob]:
+        self._check()
+        calls["allKnobs"] += 1
+        return list(self._order)
+
+    def numKnobs(self) -> int:
+        return len(self._order)
+
+    def addKnob(self, knob: Knob) -> bool:
+        self._check()
+        calls["addKnob"] += 1
+        if knob._node is None:
+            knob._node = self
+        self._knobs.setdefault(knob.name(), knob)
+        self._order.append(knob)
+        return True
+
+    def removeKnob(self, knob: Knob) -> None:
+        self._check()
+        calls["removeKnob"] += 1
+        self._order.remove(knob)
+        if self._knobs.get(knob.name()) is knob:
+            del self._knobs[knob.name()]
+            for other in self._order:
+                if other.name() == knob.name():
+                    self._knobs[other.name()] = other
+                    break
+
+    def setTab(self, index: int) -> None:
+        pass
+
+    def firstFrame(self) -> int:
+        return 1
+
+    def lastFrame(self) -> int:
+        return 1
+
+    def nodes(self) -> List["Node"]:
+        self._check()
+        calls["nodes"] += 1
+        return list(self._children.values())
+
+    def node(self, name: str) -> Optional["Node"]:
+        self._check()
+        calls["node"] += 1
+        return self._children.get(name)
+
+    def begin(self) -> "Node":
+        _context.append(self)
+        return self
+
+    def end(self) -> None:
+        _context.pop()
+
+    def __enter__(self) -> "Node":
+        return self.begin()
+
+    def __exit__(self, *args: Any) -> None:
+        self.end()
+
+
+class _Nodes:
+    def __getattr__(self, cls: str) -> Callable[..., Node]:
+        def create(**knobs: Any) -> Node:
+            return Node(cls, **knobs)
+
+        return create
+
+
+class Undo:
+    def __init__(self, *args: Any) -> None:
+        pass
+
+    def begin(self, *args: Any) -> None:
+        calls["Undo.begin"] += 1
+
+    def end(self) -> None:
+        calls["Undo.end"] += 1
+
+    def cancel(self) -> None:
+        calls["Undo.cancel"] += 1
+
+
+class _Toolbar:
+    def addCommand(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+
+_context: List[Node] = []
+_root = Node("Root", "root")
+_context.append(_root)
+_this: List[Optional[Node]] = [None]
+_this_knob: List[Optional[Knob]] = [None]
+_layers: Dict[str, List[str]] = {}
+nodes = _Nodes()
+
+
+def reset() -> None:
+    _root._children.clear()
+    del _context[1:]
+    _this[0] = None
+    _this_knob[0] = None
+    _layers.clear()
+    _layers.update({name: list(chans) for name, chans in DEFAULT_LAYERS.items()})
+    calls.clear()
+
+
+def set_this(node: Optional[Node], knob: Optional[Knob] = None) -> None:
+    _this[0] = node
+    _this_knob[0] = knob
+
+
+def root() -> Node:
+    return _root
+
+
+def thisNode() -> Node:
+    return _this[0] if _this[0] is not None else _context[-1]
+
+
+def thisGroup() -> Node:
+    return _context[-1]
+
+
+def thisKnob() -> Optional[Knob]:
+    return _this_knob[0]
+
+
+def allNodes(
+    filter: Optional[str] = None, group: Optional[Node] = None, **kwargs: Any
+) -> List[Node]:
+    calls["allNodes"] += 1
+    group = _context[-1] if group is None else group
+    return [
+        node
+        for node in group._children.values()
+        if filter is None or node.Class() == filter
+    ]
+
+
+def toNode(name: str) -> Optional[Node]:
+    calls["toNode"] += 1
+    group = _context[-1]
+    *parents, node_name = name.split(".")
+    for parent in parents:
+        group = _root if parent == "root" else group._children.get(parent)
+        if group is None:
+            return None
+    return group._children.get(node_name)
+
+
+def delete(node: Node) -> None:
+    calls["delete"] += 1
+    node._check()
+    for child in list(node._children.values()):
+        delete(child)
+    del node._parent._children[node.name()]
+    node._alive = False
+
+
+def layers(node: Optional[Node] = None) -> List[str]:
+    calls["layers"] += 1
+    return list(_layers)
+
+
+def Layer(name: str, channels: Sequence[str]) -> None:
+    _layers[name] = list(channels)
+
+
+def execute(node: Node, first: int = 1, last: int = 1, increment: int = 1) -> None:
+    calls["execute"] += 1
+
+
+def getFilename(*args: Any, **kwargs: Any) -> str:
+    return ""
+
+
+def toolbar(name: str) -> _Toolbar:
+    return _Toolbar()
+
+
+def pluginAddPath(path: str) -> None:
+    pass
+
+
+reset()
@@ -1,4 +1,7 @@
 import relight_node
+from relight.utils import instrument
+
+instrument.enable_from_env()
 
 toolbar = nuke.toolbar("Nodes")
 
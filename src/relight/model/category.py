@@ -1,10 +1,20 @@
+from typing import Dict, List
+
 import nuke
 
-from relight.model.definitions import CHANNEL, NodeType
+from relight.model.definitions import CHANNEL, GRADE_CLAMP_IDENTITY, NodeType
 from relight.model.node_string import NodeString
 
 
+CROP_MODES = ["full", "auto"]
+GRADED_NODES = ((NodeType.COLOR_CORRECT, 0), (NodeType.GRADE, 0), (NodeType.GRADE, 1))
+MERGE_CHANNEL_KNOBS = ["Achannels", "Bchannels", "output"]
+MUTED_CHANNELS = "none"
+
+
 class Category(NodeString):
+    __slots__ = ()
+
     def __init__(self, name: str, x0: int = 0, y0: int = 0) -> None:
         super().__init__(name, x0, y0)
 
@@ -28,10 +38,78 @@ class Category(NodeString):
 
         shuffle = self.get_node(NodeType.SHUFFLE, 0)
         shuffle["in1"].setValue(self.name)
+        for number in range(2):
+            grade = self.get_node(NodeType.GRADE, number)
+            for kn_, enabled in GRADE_CLAMP_IDENTITY.items():
+                grade[kn_].setValue(enabled)
+
+    def set_rgb_only(self, enabled: bool) -> None:
+        channels = "rgb" if enabled else "rgba"
+        self.get_node(NodeType.SHUFFLE, 0)["out1"].setValue(channels)
+        for node_type, number in GRADED_NODES:
+            node = self.get_node(node_type, number)
+            if node is not None:
+                node["channels"].setValue(channels)
+        merge = self.get_node(NodeType.MERGE, 0)
+        if merge is not None:
+            muted = self.muted
+            for kn_ in MERGE_CHANNEL_KNOBS:
+                if not (muted and kn_ == "Bchannels"):
+                    merge[kn_].setValue(channels)
+
+    @property
+    def light(self) -> nuke.Node:
+        merge = self.get_node(NodeType.MERGE, 0)
+        if merge is None:
+            return self.endnode
+        return self.previous_element(merge.name())
+
+    @property
+    def muted(self) -> bool:
+        merge = self.get_node(NodeType.MERGE, 0)
+        return merge is not None and merge["Bchannels"].value() == MUTED_CHANNELS
+
+    def set_muted(self, enabled: bool) -> None:
+        merge = self.get_node(NodeType.MERGE, 0)
+        if merge is None:
+            raise AttributeError(f"Category '{self.name}' has no Merge to mute.")
+        channels = MUTED_CHANNELS if enabled else merge["output"].value()
+        if merge["Bchannels"].value() != channels:
+            merge["Bchannels"].setValue(channels)
+
+    def set_crop(self, mode: str) -> None:
+        if not mode in CROP_MODES:
+            raise AttributeError(
+                f"Unknown crop mode '{mode}'. Select from: {CROP_MODES}"
+            )
+        crop = self.get_node(NodeType.CROP, 0)
+        if mode == "full":
+            if crop is not None:
+                self.remove_node(NodeType.CROP, 0)
+            return
+        if crop is None:
+            shuffle = self.get_node(NodeType.SHUFFLE, 0)
+            crop = self.insert_node(NodeType.CROP, self.get_index(shuffle.name()) + 1)
+            crop["reformat"].setValue(False)
+        crop["box"].clearAnimated()
+        self._detect_bbox(crop)
+
+    @staticmethod
+    def _detect_bbox(crop: nuke.Node) -> None:
+        root = nuke.root()
+        curve_tool = nuke.nodes.CurveTool(operation="Auto Crop")
+        try:
+            curve_tool.setInput(0, crop.input(0))
+            nuke.execute(curve_tool, root.firstFrame(), root.lastFrame())
+            crop["box"].copyAnimations(curve_tool["autocropdata"].animations())
+        finally:
+            nuke.delete(curve_tool)
 
     @classmethod
-    def scan(cls, name: str):
+    def scan(cls, name: str, dependents: Dict[str, List[nuke.Node]]):
         category = cls.__new__(cls)
         setattr(category, "name", name)
+        setattr(category, "elements", {})
+        category._reset_properties()
         origin = category.get_node(NodeType.DOT, 0)
-        return cls.from_workpace(name, origin)
+        return cls.from_workpace(name, origin, dependents)
@@ -1,17 +1,21 @@
-import re
-from typing import Tuple
+import json
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import nuke
 
 from relight.model.category import Category
-from relight.model.definitions import NodeType
-from relight.utils import scan
-from relight.utils.knobs import TabGroup
-
-GRADE_KNOBS = ["blackpoint", "whitepoint", "black", "white", "multiply", "mix"]
-COLLOR_COORECT_CAT = ["master", "shadows", "midtones", "highlights"]
-COLLOR_CORRECT_KNOBS = ["saturation", "contrast", "gamma", "gain", "offset"]
-COLLOR_CORRECT_RANGES = ["lookup", "mix"]
+from relight.model.definitions import (
+    COLLOR_COORECT_CAT,
+    COLLOR_CORRECT_KNOBS,
+    COLLOR_CORRECT_RANGES,
+    GRADE_CLAMP_IDENTITY,
+    GRADE_IDENTITY,
+    GRADE_KNOBS,
+    NodeType,
+)
+from relight.utils import names, scan
+from relight.utils.knobs import TabGroup, hidden_knob
 
 NUMBER_OF_KNOBS = (
     len(COLLOR_COORECT_CAT) * len(COLLOR_CORRECT_KNOBS)
@@ -20,58 +24,202 @@ NUMBER_OF_KNOBS = (
 )
 
 
+KNOB_MODE = "knob_mode"
+KNOB_MODES = ["tabs", "editor"]
+EDITOR = "relight_editor"
+EDITOR_CATEGORY = "relight_editor_category"
+KNOB_BLOCKS = "relight_knob_blocks"
+# All knobs the reference engine evaluates, including those without a tab knob
+GRADE_VALUE_KNOBS = [*GRADE_IDENTITY, *GRADE_CLAMP_IDENTITY, "mix"]
+
+
+def knob_groups() -> Iterator[Tuple[str, NodeType, int, List[str]]]:
+    for cc_ in COLLOR_COORECT_CAT:
+        knob_prefix = f"{cc_}." if not cc_ == "master" else ""
+        knob_names = [knob_prefix + kn_ for kn_ in COLLOR_CORRECT_KNOBS]
+        yield cc_, NodeType.COLOR_CORRECT, 0, knob_names
+    yield "ranges", NodeType.COLOR_CORRECT, 0, COLLOR_CORRECT_RANGES
+    yield "grade0", NodeType.GRADE, 0, GRADE_KNOBS
+    yield "grade1", NodeType.GRADE, 1, GRADE_KNOBS
+
+
+def knob_values(category: Category) -> Dict[str, Dict[str, Any]]:
+    values: Dict[str, Dict[str, Any]] = {}
+    for _, node_type, number, knob_names in knob_groups():
+        if node_type is NodeType.GRADE:
+            knob_names = GRADE_VALUE_KNOBS
+        node = category.get_node(node_type, number)
+        node_values = values.setdefault(names.node_name(node_type, number), {})
+        for kn_ in knob_names:
+            if kn_ != "lookup":
+                node_values[kn_] = node[kn_].value()
+    return values
+
+
 def add(name: str, root: nuke.Node, category: Category) -> None:
-    with TabGroup(name, root) as tab:
+    with _record_block(name, root), TabGroup(name, root) as tab:
         tab.add_divider(name + ".upper_divider")
 
-        for cc_ in COLLOR_COORECT_CAT:
-            knob_prefix = f"{cc_}." if not cc_ == "master" else ""
-            with TabGroup(cc_, root, prefix=name) as sub_tab:
-                node = category.get_node(NodeType.COLOR_CORRECT, 0)
-                for kn_ in COLLOR_CORRECT_KNOBS:
-                    sub_tab.add_knob(node.knob(knob_prefix + kn_))
+        for group, node_type, number, knob_names in knob_groups():
+            with TabGroup(group, root, prefix=name) as sub_tab:
+                node = category.get_node(node_type, number)
+                for kn_ in knob_names:
+                    sub_tab.add_knob(node.knob(kn_))
 
-        with TabGroup("ranges", root, prefix=name) as sub_tab:
-            node = category.get_node(NodeType.COLOR_CORRECT, 0)
-            for kn_ in COLLOR_CORRECT_RANGES:
-                sub_tab.add_knob(node.knob(kn_))
+        tab.add_divider(name + ".lower_divider")
 
-        with TabGroup("grade0", root, prefix=name) as sub_tab:
-            node = category.get_node(NodeType.GRADE, 0)
-            for kn_ in GRADE_KNOBS:
-                sub_tab.add_knob(node.knob(kn_))
 
-        with TabGroup("grade1", root, prefix=name) as sub_tab:
-            node = category.get_node(NodeType.GRADE, 1)
-            for kn_ in GRADE_KNOBS:
-                sub_tab.add_knob(node.knob(kn_))
+def editor_mode(root: nuke.Node) -> bool:
+    knob = root.knob(KNOB_MODE)
+    return knob is not None and knob.value() == "editor"
 
-        tab.add_divider(name + ".lower_divider")
+
+def _editor_knob_name(group: str, knob_name: str) -> str:
+    return f"{EDITOR}_{group}_{knob_name}".replace(".", "_")
+
+
+def _add_editor(root: nuke.Node) -> None:
+    with _record_block(EDITOR, root), TabGroup(EDITOR, root):
+        for group, _, _, knob_names in knob_groups():
+            with TabGroup(group, root, prefix=EDITOR) as sub_tab:
+                for kn_ in knob_names:
+                    kn = nuke.Link_Knob(_editor_knob_name(group, kn_), kn_)
+                    sub_tab.add_knob(kn)
+
+
+def bind_editor(root: nuke.Node, name: str) -> None:
+    if root.knob(EDITOR) is None:
+        if not name:
+            return
+        _add_editor(root)
+    prefix = f"{name}_" if name else ""
+    for group, node_type, number, knob_names in knob_groups():
+        node_name = names.node_name(node_type, number, prefix)
+        for kn_ in knob_names:
+            link = f"{node_name}.{kn_}" if name else ""
+            root.knob(_editor_knob_name(group, kn_)).setLink(link)
+    root.knob(EDITOR).setLabel(f"{name}:" if name else "")
+    if root.knob(EDITOR_CATEGORY) is None:
+        root.addKnob(hidden_knob(EDITOR_CATEGORY))
+    root.knob(EDITOR_CATEGORY).setValue(name)
+
+
+def bound_category(root: nuke.Node) -> str:
+    if root.knob(EDITOR) is None:
+        return ""
+    knob = root.knob(EDITOR_CATEGORY)
+    return knob.value() if knob is not None else ""
+
+
+def remove_editor(root: nuke.Node) -> None:
+    remove(EDITOR, root)
+    knob = root.knob(EDITOR_CATEGORY)
+    if knob is not None:
+        knob.setValue("")
+
+
+def block_names(root: nuke.Node) -> List[str]:
+    return [name for name in _load_blocks(root) if name != EDITOR]
+
+
+def _load_blocks(root: nuke.Node) -> Dict[str, List[int]]:
+    knob = root.knob(KNOB_BLOCKS)
+    if knob is None or not knob.value():
+        return {}
+    try:
+        return json.loads(knob.value())
+    except ValueError:
+        return {}
+
+
+def add_blocks_knob(root: nuke.Node) -> None:
+    if root.knob(KNOB_BLOCKS) is None:
+        root.addKnob(hidden_knob(KNOB_BLOCKS))
+
+
+def _save_blocks(root: nuke.Node, blocks: Dict[str, List[int]]) -> None:
+    add_blocks_knob(root)
+    root.knob(KNOB_BLOCKS).setValue(json.dumps(blocks, separators=(",", ":")))
+
+
+@contextmanager
+def _record_block(name: str, root: nuke.Node) -> Iterator[None]:
+    begin = root.numKnobs()
+    yield
+    blocks = _load_blocks(root)
+    blocks[name] = [begin, root.numKnobs() - begin]
+    _save_blocks(root, blocks)
+
+
+def _is_block(root: nuke.Node, name: str, begin: int, count: int) -> bool:
+    if count < 2 or begin + count > root.numKnobs():
+        return False
+    first = root.knob(begin)
+    last = root.knob(begin + count - 1)
+    return (
+        first is not None
+        and last is not None
+        and first.name() == name
+        and last.name() == name
+    )
+
+
+def _remove_knob(root: nuke.Node, knob: nuke.Knob) -> None:
+    root.removeKnob(knob)
+
+
+def _remove_block(root: nuke.Node, begin: int, count: int) -> None:
+    for index in reversed(range(begin, begin + count)):
+        _remove_knob(root, root.knob(index))
+
+
+def _find_block(root: nuke.Node, name: str) -> Optional[Tuple[int, int]]:
+    indices = [
+        index for index in range(root.numKnobs()) if root.knob(index).name() == name
+    ]
+    if not indices:
+        return None
+    if len(indices) == 1:
+        # Without its end marker the extent of the block is unknown.
+        return indices[0], 1
+    return indices[0], indices[1] - indices[0] + 1
 
 
 def remove(name: str, root: nuke.Node) -> None:
-    in_category = False
-    for knob in root.allKnobs():
-        cat_match = re.search(f"^{name}$", knob.name())
-        if cat_match and (not in_category):
-            in_category = True
-        elif cat_match and in_category:
-            in_category = False
-            root.removeKnob(knob)
-            break
-        if in_category:
-            root.removeKnob(knob)
+    blocks = _load_blocks(root)
+    block = blocks.pop(name, None)
+    if block is None or not _is_block(root, name, *block):
+        block = _find_block(root, name)
+    if block is not None:
+        begin, count = block
+        _remove_block(root, begin, count)
+        for other in blocks.values():
+            if other[0] > begin:
+                other[0] -= count
+    _save_blocks(root, blocks)
 
 
-def reset(root: nuke.Node, with_prefix: Tuple[str, ...]) -> None:
+def _reset_scan(root: nuke.Node, with_prefix: Tuple[str, ...]) -> None:
     rm = list(with_prefix)
     rm.extend(GRADE_KNOBS)
     rm.extend(COLLOR_COORECT_CAT)
     rm.extend(COLLOR_CORRECT_KNOBS)
     rm.extend(COLLOR_CORRECT_RANGES)
+    rm.append(EDITOR)
     knobs = (
         kn for kn in root.allKnobs()
         if scan.filter_predicate(kn.name(), rm)
     )
     for kn_ in knobs:
-        root.removeKnob(kn_)
+        _remove_knob(root, kn_)
+
+
+def reset(root: nuke.Node, with_prefix: Tuple[str, ...]) -> None:
+    if root.knob(KNOB_BLOCKS) is None:
+        # Groups saved before the blocks were recorded
+        _reset_scan(root, with_prefix)
+    else:
+        blocks = _load_blocks(root)
+        for name in sorted(blocks, key=lambda name: -blocks[name][0]):
+            remove(name, root)
+    _save_blocks(root, {})
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Generator, List, NamedTuple, Tuple
+from typing import Dict, Generator, List, NamedTuple, Tuple
 
 XDIST: int = 250
 XOFFSET: int = 34
@@ -7,6 +7,29 @@ YDIST: int = 80
 
 CHANNEL: List[str] = ["red", "green", "blue", "alpha"]
 
+GRADE_KNOBS = ["blackpoint", "whitepoint", "black", "white", "multiply", "mix"]
+COLLOR_COORECT_CAT = ["master", "shadows", "midtones", "highlights"]
+COLLOR_CORRECT_KNOBS = ["saturation", "contrast", "gamma", "gain", "offset"]
+COLLOR_CORRECT_RANGES = ["lookup", "mix"]
+
+GRADE_IDENTITY: Dict[str, float] = {
+    "blackpoint": 0.0,
+    "whitepoint": 1.0,
+    "black": 0.0,
+    "white": 1.0,
+    "multiply": 1.0,
+    "add": 0.0,
+    "gamma": 1.0,
+}
+GRADE_CLAMP_IDENTITY: Dict[str, bool] = {"black_clamp": False, "white_clamp": False}
+COLOR_CORRECT_IDENTITY: Dict[str, float] = {
+    "saturation": 1.0,
+    "contrast": 1.0,
+    "gamma": 1.0,
+    "gain": 1.0,
+    "offset": 0.0,
+}
+
 
 class Point(NamedTuple):
     x: int = 0
@@ -15,6 +38,7 @@ class Point(NamedTuple):
 
 class NodeType(Enum):
     COLOR_CORRECT = "ColorCorrect"
+    CROP = "Crop"
     DOT = "Dot"
     GRADE = "Grade"
     MERGE = "Merge"
@@ -0,0 +1,67 @@
+from typing import Dict, Optional, Sequence, Tuple
+
+import nuke
+
+from relight.model.definitions import XDIST, YDIST, Point
+from relight.model.node_string import NodeString
+from relight.utils import place
+
+CATDIST: int = XDIST
+
+
+class Layout:
+    def __init__(self, position: Point = Point(x=0, y=0)) -> None:
+        self.position = position
+        self._targets: Dict[str, Tuple[nuke.Node, Point]] = {}
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def column(self, index: int) -> Point:
+        return Point(x=self.position.x + index * CATDIST, y=self.position.y)
+
+    def place(self, node: nuke.Node, point: Point) -> None:
+        self._targets[node.name()] = (node, point)
+
+    def place_string(self, nodestring: NodeString, position: Point) -> None:
+        nodestring._position = position
+        for node, point in nodestring.node_positions(position):
+            self.place(node, point)
+
+    def place_rig(
+        self,
+        input_node: nuke.Node,
+        output_node: nuke.Node,
+        categories: Sequence[NodeString],
+        root_index: Optional[int] = None,
+        upstream: Optional[nuke.Node] = None,
+        downstream: Optional[nuke.Node] = None,
+    ) -> None:
+        if not categories:
+            input_point = Point(x=input_node.xpos(), y=input_node.ypos())
+            output_point = Point(x=input_point.x, y=input_point.y + YDIST)
+        else:
+            for index, category in enumerate(categories):
+                self.place_string(category, self.column(index))
+            first = self.column(0)
+            input_point = Point(x=first.x, y=first.y - YDIST)
+            self.place(input_node, input_point)
+            if root_index is None:
+                root_index = len(categories) - 1
+            root = self.column(root_index)
+            rows = max(len(category) for category in categories)
+            output_point = Point(x=root.x, y=root.y + rows * YDIST)
+        self.place(output_node, output_point)
+        if upstream is not None:
+            self.place(upstream, Point(x=input_point.x, y=input_point.y - YDIST))
+        if downstream is not None:
+            self.place(downstream, Point(x=output_point.x, y=output_point.y + YDIST))
+
+    def apply(self) -> int:
+        moved = 0
+        for node, point in self._targets.values():
+            if node.xpos() != point.x or node.ypos() != point.y:
+                place.move_node_to(node, point.x, point.y)
+                moved += 1
+        self._targets = {}
+        return moved
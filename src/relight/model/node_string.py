@@ -1,11 +1,11 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, NamedTuple, Optional, Tuple
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
 
 import nuke
 
-from relight.model.definitions import NodeType, Point
+from relight.model.definitions import XOFFSET, YDIST, NodeType, Point
 from relight.model.primitive import Primitive
-from relight.utils import connect, names, place
+from relight.utils import connect, names, place, scan
 
 
 class Node(NamedTuple):
@@ -19,31 +19,41 @@ class Node(NamedTuple):
 
 
 class NodeString(ABC, Primitive):
+    __slots__ = ("_nodes", "_node_names", "_handles")
+
     def __init__(self, name: str, x0: int, y0: int) -> None:
         super().__init__(name, Point(x0, y0))
 
         self._nodes = None
         self._node_names = None
+        self._handles = None
 
         self.build()
-        self._set_node_positions()
 
     @abstractmethod
     def build(self) -> None:
         pass
 
     @classmethod
-    def from_workpace(cls, name: str, origin: nuke.Node):
+    def from_workpace(
+        cls, name: str, origin: nuke.Node, dependents: Dict[str, List[nuke.Node]]
+    ):
+        return cls.from_nodes(
+            name, scan.find_node_chain(origin, f"{name}_", dependents)
+        )
+
+    @classmethod
+    def from_nodes(cls, name: str, nodes: Sequence[nuke.Node]):
         nodestring = cls.__new__(cls)
         setattr(nodestring, "name", name)
         setattr(nodestring, "elements", {})
-        setattr(nodestring, "_position", None)
+        x0 = nodes[0].xpos() - nodestring._xoffset(nodes[0].name())
+        setattr(nodestring, "_position", Point(x=x0, y=nodes[0].ypos()))
         setattr(nodestring, "_nodes", None)
         setattr(nodestring, "_node_names", None)
-        workspaceNodes = nodestring.get_workspaceNodes(origin)
-        for nd in workspaceNodes:
-            nodestring.add_element(nd.name, nodestring.get_node(nd.type, nd.number))
-        nodestring.origin = origin
+        setattr(nodestring, "_handles", None)
+        for node in nodes:
+            nodestring.add_element(node.name(), node)
         return nodestring
 
     @property
@@ -53,7 +63,7 @@ class NodeString(ABC, Primitive):
     @origin.setter
     def origin(self, node: nuke.Node) -> None:
         if node.name() in self.elements:
-            self.elements.pop(node.name())
+            self.remove_element(node.name())
         nodes = {node.name(): node}
         nodes.update(self.elements)
         setattr(self, "elements", nodes)
@@ -86,9 +96,20 @@ class NodeString(ABC, Primitive):
             self._node_names = tuple(name for name in self.elements)
         return self._node_names
 
+    @property
+    def handles(self) -> Dict[Tuple[NodeType, int], nuke.Node]:
+        if self._handles is None:
+            self._handles = {}
+            for name, node in self.elements.items():
+                key = names.split_node_name(name, self.prefix)
+                if key is not None:
+                    self._handles[key] = node
+        return self._handles
+
     def _reset_properties(self):
         self._nodes = None
         self._node_names = None
+        self._handles = None
 
     def _reconnect(self) -> None:
         nodes = iter(self)
@@ -97,24 +118,20 @@ class NodeString(ABC, Primitive):
             connect.connect_nodes(last_node, node)
             last_node = node
 
-    def _set_node_positions(self) -> None:
-        place.move_node_to(self.origin, self.x0, self.y0)
-        nodes = iter(self)
-        last_node = next(nodes)
-        for node in nodes:
-            place.place_node_below(node, last_node)
-            last_node = node
+    def node_positions(
+        self, position: Optional[Point] = None
+    ) -> Iterator[Tuple[nuke.Node, Point]]:
+        x0, y0 = self.position if position is None else position
+        for row, (name, node) in enumerate(self.elements.items()):
+            yield node, Point(x=x0 + self._xoffset(name), y=y0 + row * YDIST)
 
-    def move_nodes(
-        self, xdist: Optional[int] = None, ydist: Optional[int] = None
-    ) -> None:
-        x0 = self.x0
-        y0 = self.y0
-        if xdist is not None:
-            x0 += xdist
-        if ydist is not None:
-            y0 += ydist
-        self.position = Point(x0, y0)
+    def _xoffset(self, name: str) -> int:
+        node_type = names.split_node_name(name, self.prefix)
+        return XOFFSET if node_type and node_type[0] is NodeType.DOT else 0
+
+    def _set_node_positions(self) -> None:
+        for node, point in self.node_positions():
+            place.move_node_to(node, point.x, point.y)
 
     def get_nodes_of_type(self, type: NodeType) -> Dict[str, nuke.Node]:
         search_name = names.node_type_name(type, self.prefix)
@@ -124,9 +141,28 @@ class NodeString(ABC, Primitive):
         sorted_node_names = sorted(list(nodes_of_type.keys()))
         return {name: nodes_of_type[name] for name in sorted_node_names}
 
-    def get_node(self, type: NodeType, number: int) -> nuke.Node:
+    @staticmethod
+    def _is_valid(node: nuke.Node, name: str) -> bool:
+        try:
+            return node.name() == name
+        except ValueError:
+            return False
+
+    def get_node(self, type: NodeType, number: int) -> Optional[nuke.Node]:
         name = names.node_name(type, number, self.prefix)
-        return nuke.toNode(name)
+        node = self.handles.get((type, number))
+        if node is not None and self._is_valid(node, name):
+            return node
+        if node is None and self.elements:
+            return None
+        return self._recover_node(name)
+
+    def _recover_node(self, name: str) -> Optional[nuke.Node]:
+        node = nuke.toNode(name)
+        if node is not None and name in self.elements:
+            self.elements[name] = node
+            self._reset_properties()
+        return node
 
     def add_origin(self, type: NodeType) -> nuke.Node:
         if self.elements:
@@ -135,6 +171,7 @@ class NodeString(ABC, Primitive):
             )
         name = names.new_node_name(type, self.prefix)
         self.add_element(name, getattr(nuke.nodes, type.value)(name=name))
+        self._reset_properties()
         return self.elements[name]
 
     def add_node(
@@ -150,15 +187,33 @@ class NodeString(ABC, Primitive):
 
         return new_node
 
+    def insert_node(self, type: NodeType, index: int) -> nuke.Node:
+        if not 0 < index < len(self):
+            raise IndexError(f"Could not insert node at {index} in '{self.name}'.")
+        name = names.new_node_name(type, self.prefix)
+        new_node = getattr(nuke.nodes, type.value)(name=name)
+        connect.connect_nodes(self[index - 1], new_node)
+        connect.connect_nodes(new_node, self[index])
+        self.insert_element(index, name, new_node)
+        self._reset_properties()
+
+        return new_node
+
     def remove_node(self, type: NodeType, number: int = 0) -> None:
         node = self.get_node(type, number)
-        self.elements.pop(node.name())
+        name = node.name()
+        index = self.get_index(name)
+        if index is not None and 0 < index < len(self) - 1:
+            connect.connect_nodes(self[index - 1], self[index + 1])
+        self.remove_element(name)
         nuke.delete(node)
+        names.release_node_name(name)
         self._reset_properties()
 
     def remove(self):
-        for node in self.elements.values():
+        for name, node in self.elements.items():
             nuke.delete(node)
+            names.release_node_name(name)
         self.elements = {}
         self._reset_properties()
 
@@ -169,22 +224,10 @@ class NodeString(ABC, Primitive):
         connect.connect_nodes(self.endnode, node, input)
 
     def get_workspaceNodes(
-        self, input: nuke.Node, nodes: Optional[List[Node]] = None
+        self, input: nuke.Node, dependents: Dict[str, List[nuke.Node]]
     ) -> List[Node]:
-        if nodes is None:
-            origin_type, origin_number = names.get_node_type_and_number(
-                input, self.prefix
-            )
-            nodes = [Node(origin_type, origin_number, self.prefix)]
-        dependent_nodes = input.dependent()
-        origins = (
-            node for node in dependent_nodes if node.name().startswith(self.prefix)
-        )
-        try:
-            input_ = next(origins)
-            node_type, node_number = names.get_node_type_and_number(input_, self.prefix)
+        nodes = []
+        for node in scan.find_node_chain(input, self.prefix, dependents):
+            node_type, node_number = names.get_node_type_and_number(node, self.prefix)
             nodes.append(Node(node_type, node_number, self.prefix))
-            self.get_workspaceNodes(input_, nodes)
-        except StopIteration:
-            pass
         return nodes
@@ -1,39 +1,78 @@
-from typing import Any, Generator, Union
+from typing import Any, Dict, Generator, Optional, Union
 
 from relight.model.definitions import Point
 
 
 class Primitive:
+    __slots__ = ("name", "_elements", "_keys", "_index", "_position")
+
     def __init__(self, name: str, position: Point) -> None:
         self.name = name
         self.elements = {}
         self._position = position
 
+    @property
+    def elements(self) -> Dict[str, Any]:
+        return self._elements
+
+    @elements.setter
+    def elements(self, elements: Dict[str, Any]) -> None:
+        self._elements = dict(elements)
+        self._keys = list(self._elements)
+        self._index = {name: i for i, name in enumerate(self._keys)}
+
     def __len__(self) -> int:
-        return len(self.elements)
+        return len(self._keys)
 
     def __iter__(self) -> Generator[Any, None, None]:
-        for node in self.elements.values():
-            yield node
+        for name in self._keys:
+            yield self._elements[name]
 
-    def __getitem__(self, indx: int) -> Any:
-        return tuple(self.elements.values())[indx]
+    def __getitem__(self, indx: Union[int, slice]) -> Any:
+        if isinstance(indx, slice):
+            return tuple(self._elements[name] for name in self._keys[indx])
+        return self._elements[self._keys[indx]]
 
     def add_element(self, name: str, element: Any) -> Any:
-        if name in self.elements:
+        if name in self._elements:
             raise TypeError(f"Could not add element '{name}'.")
-        self.elements[name] = element
+        self._index[name] = len(self._keys)
+        self._keys.append(name)
+        self._elements[name] = element
+        return element
+
+    def insert_element(self, index: int, name: str, element: Any) -> Any:
+        if name in self._elements:
+            raise TypeError(f"Could not add element '{name}'.")
+        self._keys.insert(index, name)
+        self._elements = {key: self._elements.get(key, element) for key in self._keys}
+        for i in range(index, len(self._keys)):
+            self._index[self._keys[i]] = i
         return element
 
     def remove_element(self, name: str):
-        if not name in self.elements:
+        if not name in self._elements:
             raise TypeError(f"Could not remove element '{name}'.")
-        self.elements.pop(name)
+        index = self._index.pop(name)
+        del self._keys[index]
+        for i in range(index, len(self._keys)):
+            self._index[self._keys[i]] = i
+        return self._elements.pop(name)
 
     def get_index(self, element_name: str) -> Union[None, int]:
-        if element_name in self.elements:
-            return list(self.elements.keys()).index(element_name)
-        return None
+        return self._index.get(element_name, None)
+
+    def next_element(self, element_name: str) -> Optional[Any]:
+        index = self._index.get(element_name, None)
+        if index is None or index + 1 >= len(self._keys):
+            return None
+        return self._elements[self._keys[index + 1]]
+
+    def previous_element(self, element_name: str) -> Optional[Any]:
+        index = self._index.get(element_name, None)
+        if not index:
+            return None
+        return self._elements[self._keys[index - 1]]
 
     @property
     def x0(self) -> int:
@@ -0,0 +1,51 @@
+from typing import Any, Dict, Optional, Tuple
+
+import nuke
+
+from relight.model.spec import (
+    PROXY_INPUT_EXPRESSIONS,
+    PROXY_INPUT_NAME,
+    PROXY_INPUT_VALUES,
+    PROXY_KNOB,
+    PROXY_OUTPUT_EXPRESSIONS,
+    PROXY_OUTPUT_NAME,
+    PROXY_OUTPUT_VALUES,
+)
+
+
+def is_enabled(root: nuke.Node) -> bool:
+    knob = root.knob(PROXY_KNOB)
+    return knob is not None and bool(knob.value())
+
+
+def nodes() -> Optional[Tuple[nuke.Node, nuke.Node]]:
+    proxy_input = nuke.toNode(PROXY_INPUT_NAME)
+    proxy_output = nuke.toNode(PROXY_OUTPUT_NAME)
+    if proxy_input is None or proxy_output is None:
+        return None
+    return proxy_input, proxy_output
+
+
+def _reformat(
+    name: str, values: Dict[str, Any], expressions: Dict[str, str]
+) -> nuke.Node:
+    node = nuke.nodes.Reformat(name=name)
+    for kn_, value in values.items():
+        node[kn_].setValue(value)
+    for kn_, expression in expressions.items():
+        node[kn_].setExpression(expression)
+    return node
+
+
+def create(
+    input_node: nuke.Node, output_node: nuke.Node
+) -> Tuple[nuke.Node, nuke.Node]:
+    proxy_input = _reformat(
+        PROXY_INPUT_NAME, PROXY_INPUT_VALUES, PROXY_INPUT_EXPRESSIONS
+    )
+    proxy_input.setInput(0, input_node)
+    proxy_output = _reformat(
+        PROXY_OUTPUT_NAME, PROXY_OUTPUT_VALUES, PROXY_OUTPUT_EXPRESSIONS
+    )
+    output_node.setInput(0, proxy_output)
+    return proxy_input, proxy_output
@@ -0,0 +1,72 @@
+from typing import Dict, List
+
+import nuke
+
+from relight.model.category import Category
+from relight.model.definitions import (
+    COLLOR_COORECT_CAT,
+    COLLOR_CORRECT_KNOBS,
+    COLOR_CORRECT_IDENTITY,
+    GRADE_CLAMP_IDENTITY,
+    GRADE_IDENTITY,
+    NodeType,
+)
+
+PRUNE_KNOB = "auto_prune"
+CHANNELS = ["r", "g", "b", "a"]
+
+PRUNED_NODES = (
+    (NodeType.COLOR_CORRECT, 0),
+    (NodeType.GRADE, 0),
+    (NodeType.GRADE, 1),
+)
+
+
+def _identity_terms(knob_name: str, value: float) -> List[str]:
+    return [f"{knob_name}.{channel}=={value:g}" for channel in CHANNELS]
+
+
+def _identity_expression(node_type: NodeType) -> str:
+    terms = []
+    if node_type is NodeType.GRADE:
+        for kn_, value in GRADE_IDENTITY.items():
+            terms.extend(_identity_terms(kn_, value))
+        for kn_, enabled in GRADE_CLAMP_IDENTITY.items():
+            terms.append(f"{kn_}=={int(enabled)}")
+    else:
+        for cc_ in COLLOR_COORECT_CAT:
+            knob_prefix = f"{cc_}." if not cc_ == "master" else ""
+            for kn_ in COLLOR_CORRECT_KNOBS:
+                value = COLOR_CORRECT_IDENTITY[kn_]
+                terms.extend(_identity_terms(knob_prefix + kn_, value))
+    return f"mix==0 || ({' && '.join(terms)})"
+
+
+IDENTITY_EXPRESSIONS: Dict[NodeType, str] = {
+    node_type: _identity_expression(node_type)
+    for node_type in (NodeType.COLOR_CORRECT, NodeType.GRADE)
+}
+
+
+def is_enabled(root: nuke.Node) -> bool:
+    knob = root.knob(PRUNE_KNOB)
+    return knob is not None and bool(knob.value())
+
+
+def is_pruned(category: Category) -> bool:
+    node_type, number = PRUNED_NODES[0]
+    node = category.get_node(node_type, number)
+    return node is None or node["disable"].hasExpression()
+
+
+def prune(category: Category, enabled: bool = True) -> None:
+    for node_type, number in PRUNED_NODES:
+        node = category.get_node(node_type, number)
+        if node is None:
+            continue
+        disable = node["disable"]
+        if enabled:
+            disable.setExpression(IDENTITY_EXPRESSIONS[node_type])
+        else:
+            disable.clearAnimated()
+            disable.setValue(False)
@@ -0,0 +1,25 @@
+from typing import Tuple
+
+import nuke
+
+from relight.model.category import CROP_MODES, Category
+
+RGB_ONLY_KNOB = "rgb_only"
+CROP_KNOB = "crop_mode"
+
+
+def rgb_only(root: nuke.Node) -> bool:
+    knob = root.knob(RGB_ONLY_KNOB)
+    return knob is not None and bool(knob.value())
+
+
+def defaults(root: nuke.Node) -> Tuple[bool, str]:
+    crop = root.knob(CROP_KNOB)
+    # Groups saved with the removed "data window" mode don't crop
+    mode = crop.value() if crop is not None else CROP_MODES[0]
+    return rgb_only(root), mode if mode in CROP_MODES else CROP_MODES[0]
+
+
+def restrict(category: Category, rgb: bool, crop: str) -> None:
+    category.set_rgb_only(rgb)
+    category.set_crop(crop)
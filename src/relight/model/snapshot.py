@@ -0,0 +1,201 @@
+import json
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from relight.model.definitions import (
+    COLLOR_COORECT_CAT,
+    COLLOR_CORRECT_KNOBS,
+    COLOR_CORRECT_IDENTITY,
+    GRADE_IDENTITY,
+    GRADE_KNOBS,
+    NodeType,
+)
+from relight.model.spec import KnobValues
+
+SNAPSHOT_VERSION = 1
+CHANNELS = 4
+
+Values = Tuple[float, ...]
+
+
+def _rows() -> List[Tuple[str, str, float]]:
+    rows = []
+    color_correct = f"{NodeType.COLOR_CORRECT.value}_0"
+    for cc_ in COLLOR_COORECT_CAT:
+        knob_prefix = f"{cc_}." if not cc_ == "master" else ""
+        for kn_ in COLLOR_CORRECT_KNOBS:
+            rows.append((color_correct, knob_prefix + kn_, COLOR_CORRECT_IDENTITY[kn_]))
+    rows.append((color_correct, "mix", 1.0))
+    for number in range(2):
+        grade = f"{NodeType.GRADE.value}_{number}"
+        for kn_ in GRADE_KNOBS:
+            rows.append((grade, kn_, GRADE_IDENTITY.get(kn_, 1.0)))
+    return rows
+
+
+ROWS = tuple(f"{node}.{knob}" for node, knob, _ in _rows())
+DEFAULTS = tuple(default for _, _, default in _rows())
+ROW_INDEX = {row: index for index, row in enumerate(ROWS)}
+
+
+def channel_values(value: Any) -> Values:
+    if isinstance(value, (list, tuple)):
+        values = tuple(float(item) for item in value[:CHANNELS])
+        return values + (values[-1],) * (CHANNELS - len(values))
+    return (float(value),) * CHANNELS
+
+
+class Snapshot:
+    __slots__ = ("categories", "_column", "_data")
+
+    def __init__(
+        self, categories: Sequence[str], data: Optional[Iterable[float]] = None
+    ) -> None:
+        self.categories = tuple(categories)
+        self._column = {name: index for index, name in enumerate(self.categories)}
+        if data is None:
+            count = len(self.categories)
+            data = (default for default in DEFAULTS for _ in range(CHANNELS * count))
+        self._data = array("d", data)
+        if len(self._data) != len(ROWS) * CHANNELS * len(self.categories):
+            raise AttributeError("Snapshot data does not match its categories.")
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, Snapshot)
+            and self.categories == other.categories
+            and self._data == other._data
+        )
+
+    def _row_offset(self, row: str, channel: int = 0) -> int:
+        if not row in ROW_INDEX:
+            raise AttributeError(f"Unknown knob '{row}'. Select from: {ROWS}")
+        return (ROW_INDEX[row] * CHANNELS + channel) * len(self.categories)
+
+    def _column_index(self, name: str) -> int:
+        if not name in self._column:
+            raise AttributeError(f"Category '{name}' is not in the snapshot.")
+        return self._column[name]
+
+    def get(self, name: str, row: str) -> Values:
+        column = self._column_index(name)
+        return tuple(
+            self._data[self._row_offset(row, channel) + column]
+            for channel in range(CHANNELS)
+        )
+
+    def set(self, name: str, row: str, value: Any) -> None:
+        column = self._column_index(name)
+        for channel, item in enumerate(channel_values(value)):
+            self._data[self._row_offset(row, channel) + column] = item
+
+    def row(self, row: str, channel: int = 0) -> array:
+        offset = self._row_offset(row, channel)
+        return self._data[offset : offset + len(self.categories)]
+
+    def _columns(self, names: Optional[Iterable[str]]) -> List[int]:
+        if names is None:
+            return list(range(len(self.categories)))
+        return [self._column_index(name) for name in names]
+
+    def scale(
+        self, row: str, factor: float, names: Optional[Iterable[str]] = None
+    ) -> None:
+        columns = self._columns(names)
+        for channel in range(CHANNELS):
+            offset = self._row_offset(row, channel)
+            for column in columns:
+                self._data[offset + column] *= factor
+
+    def normalize(
+        self, row: str, target: float = 1.0, names: Optional[Iterable[str]] = None
+    ) -> None:
+        columns = self._columns(names)
+        peak = max(
+            (
+                abs(self._data[self._row_offset(row, channel) + column])
+                for channel in range(CHANNELS)
+                for column in columns
+            ),
+            default=0.0,
+        )
+        if peak:
+            self.scale(row, target / peak, names)
+
+    def expose(
+        self,
+        stops: float,
+        names: Optional[Iterable[str]] = None,
+        row: str = f"{NodeType.GRADE.value}_1.multiply",
+    ) -> None:
+        self.scale(row, 2.0**stops, names)
+
+    def diff(self, other: "Snapshot") -> Dict[str, Dict[str, Tuple[Any, Any]]]:
+        changes: Dict[str, Dict[str, Tuple[Any, Any]]] = {}
+        for name in dict.fromkeys(self.categories + other.categories):
+            for row in ROWS:
+                old = self.get(name, row) if name in self._column else None
+                new = other.get(name, row) if name in other._column else None
+                if old != new:
+                    changes.setdefault(name, {})[row] = (old, new)
+        return changes
+
+    @classmethod
+    def from_values(cls, values: Dict[str, KnobValues]) -> "Snapshot":
+        snapshot = cls(list(values))
+        for name, node_values in values.items():
+            for node, knob_values in node_values.items():
+                for kn_, value in knob_values.items():
+                    row = f"{node}.{kn_}"
+                    if row in ROW_INDEX:
+                        snapshot.set(name, row, value)
+        return snapshot
+
+    def values(self, name: str) -> KnobValues:
+        values: KnobValues = {}
+        for row in ROWS:
+            node, _, kn_ = row.partition(".")
+            channels = self.get(name, row)
+            value = channels[0] if len(set(channels)) == 1 else list(channels)
+            values.setdefault(node, {})[kn_] = value
+        return values
+
+    def to_json(self) -> str:
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "categories": list(self.categories),
+            "rows": list(ROWS),
+            "data": self._data.tolist(),
+        }
+        return json.dumps(data, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, value: str) -> "Snapshot":
+        data = json.loads(value)
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise AttributeError(f"Unsupported snapshot version: {data.get('version')}")
+        if tuple(data["rows"]) == ROWS:
+            return cls(data["categories"], data["data"])
+        snapshot = cls(data["categories"])
+        count = len(snapshot)
+        for index, row in enumerate(data["rows"]):
+            if row in ROW_INDEX:
+                for channel in range(CHANNELS):
+                    start = (index * CHANNELS + channel) * count
+                    offset = snapshot._row_offset(row, channel)
+                    snapshot._data[offset : offset + count] = array(
+                        "d", data["data"][start : start + count]
+                    )
+        return snapshot
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(self.to_json())
+
+    @classmethod
+    def load(cls, path: str) -> "Snapshot":
+        with open(path, encoding="utf-8") as file:
+            return cls.from_json(file.read())
@@ -0,0 +1,18 @@
+import nuke
+
+from relight.utils.knobs import hidden_knob
+
+SOLO_KNOB = "relight_solo"
+
+
+def soloed(root: nuke.Node) -> str:
+    knob = root.knob(SOLO_KNOB)
+    return knob.value() if knob is not None else ""
+
+
+def set_soloed(root: nuke.Node, name: str) -> None:
+    if soloed(root) == name:
+        return
+    if root.knob(SOLO_KNOB) is None:
+        root.addKnob(hidden_knob(SOLO_KNOB))
+    root.knob(SOLO_KNOB).setValue(name)
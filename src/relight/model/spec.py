@@ -0,0 +1,111 @@
+import json
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from relight.model.definitions import NodeType
+from relight.model.topology import MERGE_MODES
+
+NAME = "piRelight"
+INPUT_NAME = "AOV"
+OUTPUT_NAME = "Beauty"
+PROXY_INPUT_NAME = "Proxy"
+PROXY_OUTPUT_NAME = "FullRes"
+KNOB_CHANGED = "import relight_node\nrelight_node.knob_changed()"
+ON_CREATE = "import relight_node\nrelight_node.on_create()"
+ON_DESTROY = "import relight_node\nrelight_node.on_destroy()"
+
+STATE_KNOB = "relight_state"
+STATE_VERSION = 1
+
+PROXY_KNOB = "proxy"
+PROXY_SCALE_KNOB = "proxy_scale"
+PROXY_WIDTH_KNOB = "proxy_width"
+# Viewer only: renders and nuke.execute evaluate $gui as false.
+PROXY_DISABLE = f"!parent.{PROXY_KNOB} || !$gui"
+PROXY_INPUT_VALUES: Dict[str, Any] = {"type": "scale"}
+PROXY_INPUT_EXPRESSIONS = {
+    "scale": f"parent.{PROXY_WIDTH_KNOB} > 0 ? "
+    f"parent.{PROXY_WIDTH_KNOB} / input.width : parent.{PROXY_SCALE_KNOB}",
+    "disable": PROXY_DISABLE,
+}
+PROXY_OUTPUT_VALUES: Dict[str, Any] = {
+    "type": "to box",
+    "box_fixed": True,
+    "resize": "distort",
+}
+PROXY_OUTPUT_EXPRESSIONS = {
+    "box_width": f"{INPUT_NAME}.width",
+    "box_height": f"{INPUT_NAME}.height",
+    "disable": PROXY_DISABLE,
+}
+
+CATEGORY_NODES: Tuple[Tuple[NodeType, int], ...] = (
+    (NodeType.DOT, 0),
+    (NodeType.SHUFFLE, 0),
+    (NodeType.COLOR_CORRECT, 0),
+    (NodeType.GRADE, 0),
+    (NodeType.GRADE, 1),
+    (NodeType.MERGE, 0),
+)
+
+KnobValues = Dict[str, Dict[str, Any]]
+
+
+def category_node_names(name: str) -> List[str]:
+    return [f"{name}_{type.value}_{number}" for type, number in CATEGORY_NODES]
+
+
+def encode_state(categories: Mapping[str, List[str]]) -> str:
+    data = {
+        "version": STATE_VERSION,
+        "categories": [[name, node_names] for name, node_names in categories.items()],
+    }
+    return json.dumps(data, separators=(",", ":"))
+
+
+def _is_state_entry(entry: Any) -> bool:
+    return (
+        isinstance(entry, list)
+        and len(entry) == 2
+        and isinstance(entry[0], str)
+        and isinstance(entry[1], list)
+        and all(isinstance(node_name, str) for node_name in entry[1])
+    )
+
+
+def decode_state(value: str) -> Optional[Dict[str, List[str]]]:
+    if not value:
+        return None
+    try:
+        data = json.loads(value)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get("version") != STATE_VERSION:
+        return None
+    categories = data.get("categories")
+    if not isinstance(categories, list) or not all(map(_is_state_entry, categories)):
+        return None
+    return {name: list(node_names) for name, node_names in categories}
+
+
+class RigSpec(NamedTuple):
+    categories: Tuple[str, ...] = ()
+    merge_mode: str = MERGE_MODES[0]
+    values: Dict[str, KnobValues] = {}
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "RigSpec":
+        categories = data.get("categories", {})
+        if not isinstance(categories, dict):
+            categories = {name: {} for name in categories}
+        merge_mode = data.get("merge_mode", MERGE_MODES[0])
+        if not merge_mode in MERGE_MODES:
+            raise AttributeError(
+                f"Unknown merge mode '{merge_mode}'. Select from: {MERGE_MODES}"
+            )
+        return cls(tuple(categories), merge_mode, dict(categories))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "merge_mode": self.merge_mode,
+            "categories": {name: self.values.get(name, {}) for name in self.categories},
+        }
@@ -0,0 +1,27 @@
+from typing import Dict, List, Optional
+
+import nuke
+
+from relight.model.spec import STATE_KNOB, decode_state, encode_state
+from relight.utils.knobs import hidden_knob
+
+
+def add_knob(root: nuke.Node) -> None:
+    if root.knob(STATE_KNOB) is None:
+        root.addKnob(hidden_knob(STATE_KNOB))
+
+
+def load(root: nuke.Node) -> Optional[Dict[str, List[str]]]:
+    knob = root.knob(STATE_KNOB)
+    if knob is None:
+        return None
+    return decode_state(knob.value())
+
+
+def save(root: nuke.Node, categories: Dict[str, List[str]]) -> None:
+    add_knob(root)
+    root.knob(STATE_KNOB).setValue(encode_state(categories))
+
+
+def clear(root: nuke.Node) -> None:
+    save(root, {})
@@ -0,0 +1,23 @@
+from typing import List
+
+MERGE_MODE = "merge_mode"
+MERGE_MODES = ["chain", "tree", "multi"]
+
+
+def merge_children(mode: str, count: int) -> List[List[int]]:
+    if mode == "tree":
+        return [[i for i in (2 * k + 1, 2 * k + 2) if i < count] for k in range(count)]
+    if mode == "multi":
+        return [list(range(1, count)) if k == 0 else [] for k in range(count)]
+    return [[k - 1] if k > 0 else [] for k in range(count)]
+
+
+def merge_root(mode: str, count: int) -> int:
+    if mode in ("tree", "multi"):
+        return 0
+    return count - 1
+
+
+def merge_input(position: int) -> int:
+    # Merge2 input 2 is the mask, A inputs continue at 3.
+    return 1 if position == 0 else position + 2
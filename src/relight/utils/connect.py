@@ -1,3 +1,5 @@
+from typing import Optional
+
 import nuke
 
 
@@ -5,3 +7,16 @@ def connect_nodes(
     src_node: nuke.Node, dest_node: nuke.Node, dest_input: int = 0
 ) -> None:
     dest_node.setInput(dest_input, src_node)
+
+
+def reconnect_nodes(
+    src_node: Optional[nuke.Node], dest_node: nuke.Node, dest_input: int = 0
+) -> bool:
+    current = dest_node.input(dest_input)
+    if current is None and src_node is None:
+        return False
+    if current is not None and src_node is not None:
+        if current.name() == src_node.name():
+            return False
+    dest_node.setInput(dest_input, src_node)
+    return True
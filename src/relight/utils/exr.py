@@ -0,0 +1,138 @@
+import functools
+import os
+import re
+import struct
+from typing import BinaryIO, Dict, List, Tuple
+
+MAGIC = 20000630
+MULTI_PART = 0x1000
+CHUNK_SIZE = 1 << 16
+MAX_NAME_SIZE = 256
+MAX_ATTRIBUTE_SIZE = 1 << 24
+FRAME_PATTERN = re.compile(r"%0?(\d*)d|#+")
+
+Header = Dict[str, object]
+
+
+class _Reader:
+    def __init__(self, file: BinaryIO, size: int) -> None:
+        self._file = file
+        self._size = size
+        self._offset = 0
+        self._buffer = b""
+        self._pos = 0
+
+    def remaining(self) -> int:
+        return self._size - self._offset + len(self._buffer) - self._pos
+
+    def _fill(self, size: int) -> None:
+        while len(self._buffer) - self._pos < size:
+            chunk = self._file.read(CHUNK_SIZE)
+            if not chunk:
+                raise ValueError("Unexpected end of EXR header.")
+            self._offset += len(chunk)
+            self._buffer = self._buffer[self._pos :] + chunk
+            self._pos = 0
+
+    def read(self, size: int) -> bytes:
+        self._fill(size)
+        data = self._buffer[self._pos : self._pos + size]
+        self._pos += size
+        return data
+
+    def int32(self) -> int:
+        return struct.unpack("<i", self.read(4))[0]
+
+    def string(self) -> str:
+        while True:
+            end = self._buffer.find(b"\0", self._pos)
+            if end >= 0:
+                data = self._buffer[self._pos : end]
+                self._pos = end + 1
+                return data.decode("utf-8", "replace")
+            if len(self._buffer) - self._pos > MAX_NAME_SIZE:
+                raise ValueError("EXR header name is too long.")
+            self._fill(len(self._buffer) - self._pos + 1)
+
+
+def _channel_list(data: bytes) -> List[str]:
+    channels = []
+    pos = 0
+    while pos < len(data) and data[pos] != 0:
+        end = data.index(b"\0", pos)
+        channels.append(data[pos:end].decode("utf-8", "replace"))
+        # pixel type, pLinear, reserved, x and y sampling
+        pos = end + 1 + 16
+    return channels
+
+
+def _header(reader: _Reader) -> Header:
+    header: Header = {}
+    while True:
+        name = reader.string()
+        if not name:
+            return header
+        attribute_type = reader.string()
+        size = reader.int32()
+        if not 0 <= size <= min(MAX_ATTRIBUTE_SIZE, reader.remaining()):
+            raise ValueError(f"Invalid size {size} for EXR attribute '{name}'.")
+        data = reader.read(size)
+        if attribute_type == "chlist":
+            header[name] = _channel_list(data)
+        elif attribute_type == "string":
+            header[name] = data.decode("utf-8", "replace")
+
+
+def read_headers(path: str) -> List[Header]:
+    with open(path, "rb") as file:
+        reader = _Reader(file, os.fstat(file.fileno()).st_size)
+        if reader.int32() != MAGIC:
+            raise ValueError(f"'{path}' is not an OpenEXR file.")
+        version = reader.int32()
+        if not version & MULTI_PART:
+            return [_header(reader)]
+        headers = []
+        while True:
+            header = _header(reader)
+            if not header:
+                return headers
+            headers.append(header)
+
+
+def channel_layer(headers: List[Header]) -> Tuple[str, ...]:
+    layers = []
+    for header in headers:
+        part = header.get("name", "")
+        for channel in header.get("channels", ()):
+            layer, _, _ = channel.rpartition(".")
+            layer = layer or part
+            if layer:
+                layers.append(layer)
+    return tuple(dict.fromkeys(layers))
+
+
+# The modification time is only part of the cache key.
+@functools.lru_cache(maxsize=512)
+def _cached_layer(path: str, _mtime: float) -> Tuple[str, ...]:
+    return channel_layer(read_headers(path))
+
+
+def read_layer(path: str) -> Tuple[str, ...]:
+    return _cached_layer(path, os.path.getmtime(path))
+
+
+def frame_path(pattern: str, frame: int) -> str:
+    def replace(match: "re.Match") -> str:
+        text = match.group(0)
+        width = len(text) if text.startswith("#") else int(match.group(1) or 0)
+        return f"{frame:0{width}d}"
+
+    return FRAME_PATTERN.sub(replace, pattern)
+
+
+def sequence_layer(pattern: str, first: int, frames: int = 3) -> Tuple[str, ...]:
+    for frame in range(first, first + frames):
+        path = frame_path(pattern, frame)
+        if os.path.isfile(path):
+            return read_layer(path)
+    return ()
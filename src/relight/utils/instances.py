@@ -0,0 +1,54 @@
+from typing import List, Optional
+
+import nuke
+
+from relight.model.spec import STATE_KNOB
+
+
+class InstanceRegistry:
+    def __init__(self) -> None:
+        self._groups: List[nuke.Node] = []
+        self._complete = False
+
+    @staticmethod
+    def _full_name(group: nuke.Node) -> Optional[str]:
+        try:
+            return group.fullName()
+        except ValueError:
+            return None
+
+    def rebuild(self) -> None:
+        self._groups = [
+            node
+            for node in nuke.allNodes("Group", group=nuke.root(), recurseGroups=True)
+            if node.knob(STATE_KNOB) is not None
+        ]
+        self._complete = True
+
+    def add(self, group: nuke.Node) -> None:
+        full_name = self._full_name(group)
+        if full_name is None:
+            return
+        self.discard(group)
+        self._groups.append(group)
+
+    def discard(self, group: nuke.Node) -> None:
+        full_name = self._full_name(group)
+        self._groups = [
+            node
+            for node in self._groups
+            if not node is group and self._full_name(node) not in (None, full_name)
+        ]
+
+    def groups(self) -> List[nuke.Node]:
+        if not self._complete:
+            self.rebuild()
+        self._groups = [node for node in self._groups if self._full_name(node)]
+        return list(self._groups)
+
+
+_registry = InstanceRegistry()
+
+
+def registry() -> InstanceRegistry:
+    return _registry
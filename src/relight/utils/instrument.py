@@ -0,0 +1,208 @@
+import functools
+import inspect
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import nuke
+
+from relight.utils.knobs import python_script_knob
+
+PROFILE_ENV = "RELIGHT_PROFILE"
+DIAGNOSTICS_TAB = "relight_diagnostics"
+DIAGNOSTICS_KNOB = "relight_profile"
+NUKE_FUNCTIONS = ("allNodes", "toNode", "delete")
+BATCH_OPERATION = "Manager.batch"
+
+
+class Profile:
+    def __init__(self) -> None:
+        self.operations: Dict[str, List[float]] = {}
+        self.nuke_calls: Dict[str, List[float]] = {}
+
+    @staticmethod
+    def _record(table: Dict[str, List[float]], name: str, seconds: float) -> None:
+        entry = table.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def record_operation(self, name: str, seconds: float) -> None:
+        self._record(self.operations, name, seconds)
+
+    def record_nuke_call(self, name: str, seconds: float) -> None:
+        self._record(self.nuke_calls, name, seconds)
+
+    def clear(self) -> None:
+        self.operations = {}
+        self.nuke_calls = {}
+
+    @staticmethod
+    def _table(table: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {"count": int(count), "seconds": round(seconds, 6)}
+            for name, (count, seconds) in sorted(
+                table.items(), key=lambda item: -item[1][1]
+            )
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "nuke_version": getattr(nuke, "NUKE_VERSION_STRING", ""),
+            "operations": self._table(self.operations),
+            "nuke_calls": self._table(self.nuke_calls),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=1)
+
+    def report(self) -> str:
+        lines = []
+        for title, table in (
+            ("operation", self.operations),
+            ("nuke call", self.nuke_calls),
+        ):
+            lines.append(f"{title:<40}{'count':>8}{'ms':>10}")
+            for name, entry in self._table(table).items():
+                milliseconds = entry["seconds"] * 1000
+                lines.append(f"{name:<40}{entry['count']:>8}{milliseconds:>10.1f}")
+            lines.append("")
+        return "\n".join(lines)
+
+
+PROFILE = Profile()
+_originals: Dict[Tuple[Any, str], Callable] = {}
+
+
+def requested() -> bool:
+    return os.environ.get(PROFILE_ENV, "") not in ("", "0")
+
+
+def is_enabled() -> bool:
+    return bool(_originals)
+
+
+def _timed(func: Callable, name: str, record: Callable[[str, float], None]) -> Callable:
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record(name, time.perf_counter() - start)
+
+    return wrapper
+
+
+def _patch(owner: Any, attr: str, name: str, record: Callable) -> bool:
+    func = getattr(owner, attr)
+    try:
+        setattr(owner, attr, _timed(func, name, record))
+    except (AttributeError, TypeError):
+        return False
+    _originals[(owner, attr)] = func
+    return True
+
+
+def _call_sites() -> Iterator[Tuple[Any, str, str]]:
+    # nuke.Node is a C type in Nuke, so its methods are counted where the
+    # plug-in calls them.
+    from relight.model import category_knobs
+    from relight.utils import connect, scan
+    from relight.utils.knobs import TabGroup
+
+    for attr in ("connect_nodes", "reconnect_nodes"):
+        yield connect, attr, f"Node.setInput in connect.{attr}"
+    for attr in ("open", "add_knob", "add_divider", "close"):
+        yield TabGroup, attr, f"Node.addKnob in TabGroup.{attr}"
+    yield category_knobs, "_remove_knob", "Node.removeKnob in category_knobs"
+    yield scan, "dependency_map", "Node.input in scan.dependency_map"
+
+
+def _operations() -> Iterator[Tuple[Any, str, str]]:
+    from relight.model import category_knobs
+    from relight.model.node_string import NodeString
+    from relight.utils import scan
+    from relight_manager import Manager
+
+    # Manager.batch times its own body, wrapping it would time the generator.
+    excluded = {(owner, attr) for owner, attr, _ in _call_sites()}
+    excluded.add((Manager, "batch"))
+    for cls in (Manager, NodeString):
+        for attr, value in vars(cls).items():
+            if inspect.isfunction(value) and (attr == "__init__" or attr[0] != "_"):
+                if (cls, attr) not in excluded:
+                    yield cls, attr, f"{cls.__name__}.{attr}"
+    for module in (scan, category_knobs):
+        for attr, value in vars(module).items():
+            if inspect.isfunction(value) and value.__module__ == module.__name__:
+                if (module, attr) not in excluded:
+                    name = f"{module.__name__.rpartition('.')[2]}.{attr}"
+                    yield module, attr, name
+
+
+def record_operation(name: str, seconds: float) -> None:
+    if is_enabled():
+        PROFILE.record_operation(name, seconds)
+
+
+def enable() -> None:
+    if is_enabled():
+        return
+    for attr in NUKE_FUNCTIONS:
+        _patch(nuke, attr, f"nuke.{attr}", PROFILE.record_nuke_call)
+    for owner, attr, name in _call_sites():
+        _patch(owner, attr, name, PROFILE.record_nuke_call)
+    for owner, attr, name in _operations():
+        _patch(owner, attr, name, PROFILE.record_operation)
+
+
+def disable() -> None:
+    for (owner, attr), func in _originals.items():
+        setattr(owner, attr, func)
+    _originals.clear()
+
+
+def enable_from_env() -> None:
+    if requested():
+        enable()
+
+
+def add_knobs(root: nuke.Node) -> None:
+    if root.knob(DIAGNOSTICS_TAB) is not None:
+        return
+    root.addKnob(nuke.Tab_Knob(DIAGNOSTICS_TAB, "Diagnostics"))
+    kn = nuke.Multiline_Eval_String_Knob(DIAGNOSTICS_KNOB, "profile")
+    kn.setFlag(nuke.READ_ONLY)
+    root.addKnob(kn)
+    for button, tool_tip in [
+        ("refresh profile", "Show the profile recorded so far"),
+        ("export profile", "Save the profile as JSON"),
+        ("clear profile", "Discard the profile recorded so far"),
+    ]:
+        root.addKnob(
+            python_script_knob(
+                label=button,
+                script=(
+                    "from relight.utils import instrument\n"
+                    f"instrument.{button.replace(' ', '_')}_button()"
+                ),
+                tool_tip=tool_tip,
+            )
+        )
+
+
+def refresh_profile_button() -> None:
+    nuke.thisNode().knob(DIAGNOSTICS_KNOB).setValue(PROFILE.report())
+
+
+def export_profile_button() -> None:
+    path = nuke.getFilename("Export relight profile", "*.json", type="save")
+    if path:
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(PROFILE.to_json())
+
+
+def clear_profile_button() -> None:
+    PROFILE.clear()
+    refresh_profile_button()
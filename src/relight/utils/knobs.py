@@ -7,7 +7,8 @@ import nuke
 def python_script_knob(
     label: str, script: str, tool_tip: str = ""
 ) -> nuke.PyScript_Knob:
-    kn = nuke.PyScript_Knob(f"py_button_{label.lower()}", label, script)
+    name = label.lower().replace(" ", "_")
+    kn = nuke.PyScript_Knob(f"py_button_{name}", label, script)
     if tool_tip:
         kn.setTooltip(tool_tip)
     return kn
@@ -18,6 +19,19 @@ def divider_knob(name: str) -> nuke.Text_Knob:
     return nuke.Text_Knob(name, "", divider_str)
 
 
+def hidden_knob(name: str, value: str = "") -> nuke.String_Knob:
+    kn = nuke.String_Knob(name, name, value)
+    kn.setFlag(nuke.INVISIBLE)
+    return kn
+
+
+def chain_script(knob: nuke.Knob, script: str) -> None:
+    value = knob.value()
+    if script in value:
+        return
+    knob.setValue(f"{value}\n{script}" if value.strip() else script)
+
+
 class TabGroup:
     def __init__(
         self, name: str, node: Optional[nuke.Node] = None, prefix: str = ""
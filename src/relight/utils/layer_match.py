@@ -0,0 +1,75 @@
+import functools
+import json
+import os
+import re
+from typing import Iterable, NamedTuple, Optional, Pattern, Tuple, Union
+
+CONFIG_ENV = "RELIGHT_LAYER_CONFIG"
+REGEX_ENV = "RELIGHT_LAYER_REGEX"
+CONFIG_PATH = os.path.join(os.path.expanduser("~"), ".nuke", "relight_layers.json")
+RULE_KEYS = ("prefix", "suffix", "regex")
+
+Patterns = Union[None, str, Iterable[str]]
+
+
+class LayerRules(NamedTuple):
+    prefix: Tuple[str, ...] = ()
+    suffix: Tuple[str, ...] = ()
+    regex: Tuple[str, ...] = ()
+
+
+def _patterns(value: Patterns) -> Tuple[str, ...]:
+    if value is None:
+        return ()
+    if isinstance(value, str):
+        return (value,)
+    return tuple(value)
+
+
+@functools.lru_cache(maxsize=32)
+def compile_rules(rules: LayerRules) -> Pattern:
+    alternatives = [f"^{re.escape(prefix)}" for prefix in rules.prefix]
+    alternatives += [f"{re.escape(suffix)}$" for suffix in rules.suffix]
+    alternatives += [f"(?:{regex})" for regex in rules.regex]
+    if not alternatives:
+        alternatives = ["."]
+    try:
+        return re.compile("|".join(alternatives))
+    except re.error as err:
+        raise AttributeError(f"Invalid layer pattern in {rules.regex}: {err}") from err
+
+
+# The modification time is only part of the cache key.
+@functools.lru_cache(maxsize=8)
+def _read_config(path: str, _mtime: float) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    try:
+        with open(path, encoding="utf-8") as file:
+            config = json.load(file)
+    except ValueError as err:
+        raise AttributeError(f"Invalid layer config '{path}': {err}") from err
+    unknown = set(config) - set(RULE_KEYS)
+    if unknown:
+        raise AttributeError(
+            f"Unknown keys {sorted(unknown)} in '{path}'. Select from: {RULE_KEYS}"
+        )
+    return tuple((key, _patterns(value)) for key, value in config.items())
+
+
+def config_path() -> Optional[str]:
+    path = os.environ.get(CONFIG_ENV) or CONFIG_PATH
+    return path if os.path.isfile(path) else None
+
+
+def load_rules(prefix: Patterns = None, suffix: Patterns = None) -> LayerRules:
+    rules = LayerRules(_patterns(prefix), _patterns(suffix))
+    path = config_path()
+    if path is not None:
+        rules = rules._replace(**dict(_read_config(path, os.path.getmtime(path))))
+    regex = os.environ.get(REGEX_ENV)
+    if regex:
+        rules = rules._replace(regex=rules.regex + (regex,))
+    return rules
+
+
+def matcher(prefix: Patterns = None, suffix: Patterns = None) -> Pattern:
+    return compile_rules(load_rules(prefix, suffix))
@@ -1,10 +1,71 @@
 import copy
-from typing import Tuple
+from typing import Dict, Optional, Tuple
 
 import nuke
 
 from relight.model.definitions import NodeType
-from relight.utils.scan import find_workspace_nodes
+
+
+class NameRegistry:
+    def __init__(self, group: nuke.Node) -> None:
+        self.group = group
+        self._next_number: Dict[str, int] = {}
+        self.rebuild()
+
+    @staticmethod
+    def _split(name: str) -> Tuple[str, Optional[int]]:
+        node_prefix, _, number = name.rpartition("_")
+        if node_prefix and number.isdigit():
+            return node_prefix, int(number)
+        return name, None
+
+    def _is_free(self, node_prefix: str, number: int) -> bool:
+        return self.group.node(f"{node_prefix}_{number}") is None
+
+    def rebuild(self) -> None:
+        self._next_number = {}
+        for node in self.group.nodes():
+            self.add(node.name())
+
+    def add(self, name: str) -> None:
+        node_prefix, number = self._split(name)
+        if number is None:
+            return
+        next_number = self._next_number.get(node_prefix, 0)
+        self._next_number[node_prefix] = max(next_number, number + 1)
+
+    def release(self, name: str) -> None:
+        node_prefix, number = self._split(name)
+        if number is None or self._next_number.get(node_prefix) != number + 1:
+            return
+        while number > 0 and self._is_free(node_prefix, number - 1):
+            number -= 1
+        self._next_number[node_prefix] = number
+
+    def new_name(self, node_prefix: str) -> str:
+        number = self._next_number.get(node_prefix, 0)
+        if number > 0 and self._is_free(node_prefix, number - 1):
+            # Nodes were deleted behind our back (e.g. undo), start over.
+            self.rebuild()
+            number = self._next_number.get(node_prefix, 0)
+        while not self._is_free(node_prefix, number):
+            number += 1
+        self._next_number[node_prefix] = number + 1
+        return f"{node_prefix}_{number}"
+
+
+_registries: Dict[str, NameRegistry] = {}
+_NODE_TYPES = frozenset(NodeType.value_generator())
+
+
+def registry(group: Optional[nuke.Node] = None) -> NameRegistry:
+    group = nuke.thisGroup() if group is None else group
+    key = group.fullName()
+    name_registry = _registries.get(key)
+    if name_registry is None or name_registry.group != group:
+        name_registry = NameRegistry(group)
+        _registries[key] = name_registry
+    return name_registry
 
 
 def remove_suffix(input_string: str, suffix: str) -> str:
@@ -31,16 +92,20 @@ def node_name(type: NodeType, number: int, prefix: str = "") -> str:
 
 
 def new_node_name(type: NodeType, prefix: str = "") -> str:
-    node_prefix = node_type_name(type, prefix)
-    nodes_of_type = find_workspace_nodes(node_prefix)
-    if nodes_of_type:
-        node_names_of_type = sorted(list(nodes_of_type.keys()))
-        last_name_of_type = node_names_of_type[-1]
-        last_node_number = last_name_of_type.split("_")[-1]
-        node_number = int(last_node_number) + 1
-    else:
-        node_number = 0
-    return node_name(type, node_number, prefix)
+    return registry().new_name(node_type_name(type, prefix))
+
+
+def release_node_name(name: str) -> None:
+    registry().release(name)
+
+
+def split_node_name(name: str, prefix: str = "") -> Optional[Tuple[NodeType, int]]:
+    if not name.startswith(prefix):
+        return None
+    node_type, _, node_number = name[len(prefix) :].rpartition("_")
+    if not node_number.isdigit() or not node_type in _NODE_TYPES:
+        return None
+    return NodeType(node_type), int(node_number)
 
 
 def get_node_type_and_number(node: nuke.Node, prefix: str = "") -> Tuple[NodeType, int]:
@@ -0,0 +1,171 @@
+import re
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+INDENT = " "
+BARE_WORD = re.compile(r"[\w.+\-/:]+")
+HEADER = re.compile(r"^(?P<indent> *)(?P<cls>\w+) \{$")
+
+
+class Block(NamedTuple):
+    cls: str
+    start: int
+    end: int
+    entries: List[Tuple[str, List[str]]]
+
+    def value(self, knob_name: str) -> Optional[str]:
+        return entry_value(self.entries, knob_name)
+
+    @property
+    def name(self) -> str:
+        return unquote(self.value("name") or "")
+
+
+def entry_value(
+    entries: Sequence[Tuple[str, List[str]]], knob_name: str
+) -> Optional[str]:
+    for name, lines in entries:
+        if name == knob_name:
+            return " ".join(line.strip() for line in lines)[len(name) + 1 :]
+    return None
+
+
+def quote(value: str) -> str:
+    if BARE_WORD.fullmatch(value):
+        return value
+    for char, escaped in (
+        ("\\", "\\\\"),
+        ('"', '\\"'),
+        ("[", "\\["),
+        ("$", "\\$"),
+        ("\n", "\\n"),
+    ):
+        value = value.replace(char, escaped)
+    return f'"{value}"'
+
+
+def unquote(value: str) -> str:
+    if len(value) < 2 or not value[0] == '"' == value[-1]:
+        return value
+    value = value[1:-1]
+    for char, escaped in (
+        ("\n", "\\n"),
+        ("$", "\\$"),
+        ("[", "\\["),
+        ('"', '\\"'),
+        ("\\", "\\\\"),
+    ):
+        value = value.replace(escaped, char)
+    return value
+
+
+def format_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return format(value, ".10g")
+    if isinstance(value, (list, tuple)):
+        return "{" + " ".join(format_value(item) for item in value) + "}"
+    return quote(str(value))
+
+
+def _depth(line: str, depth: int = 0, quoted: bool = False) -> Tuple[int, bool]:
+    # As in Tcl, braces are literal inside quotes and quotes inside braces.
+    escaped = False
+    for char in line:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == '"' and not depth:
+            quoted = not quoted
+        elif char == "{" and not quoted:
+            depth += 1
+        elif char == "}" and not quoted:
+            depth -= 1
+    return depth, quoted
+
+
+def _entry_name(line: str) -> str:
+    words = line.strip().split()
+    if not words:
+        return ""
+    if words[0] == "addUserKnob" and len(words) > 2:
+        return f"addUserKnob {words[2]}"
+    return words[0]
+
+
+def _entries(lines: Sequence[str]) -> List[Tuple[str, List[str]]]:
+    entries: List[Tuple[str, List[str]]] = []
+    depth = 0
+    quoted = False
+    for line in lines:
+        if depth > 0 or quoted:
+            entries[-1][1].append(line)
+        else:
+            entries.append((_entry_name(line), [line]))
+        depth, quoted = _depth(line, depth, quoted)
+    return entries
+
+
+def blocks(lines: Sequence[str], indent: str = "") -> Iterator[Block]:
+    index = 0
+    while index < len(lines):
+        match = HEADER.match(lines[index])
+        if match is None or match.group("indent") != indent:
+            index += 1
+            continue
+        end = index + 1
+        while end < len(lines) and lines[end] != f"{indent}}}":
+            end += 1
+        entries = _entries(lines[index + 1 : end])
+        yield Block(match.group("cls"), index, end + 1, entries)
+        index = end + 1
+
+
+def group_end(lines: Sequence[str], header_end: int, indent: str = "") -> int:
+    for index in range(header_end, len(lines)):
+        if lines[index] == f"{indent}end_group":
+            return index
+    raise AttributeError("Could not find the end of the group.")
+
+
+def knob_lines(name: str, value: Any, indent: str = INDENT) -> List[str]:
+    return [f"{indent}{name} {format_value(value)}"]
+
+
+def expression_lines(name: str, expression: str, indent: str = INDENT) -> List[str]:
+    return [f"{indent}{name} {{{{{quote(expression)}}}}}"]
+
+
+def node_lines(
+    cls: str, entries: Sequence[Tuple[str, List[str]]], indent: str = ""
+) -> List[str]:
+    lines = [f"{indent}{cls} {{"]
+    for _, entry_lines in entries:
+        lines.extend(entry_lines)
+    lines.append(f"{indent}}}")
+    return lines
+
+
+def set_entry(
+    entries: List[Tuple[str, List[str]]], name: str, lines: List[str]
+) -> None:
+    for index, (entry_name, _) in enumerate(entries):
+        if entry_name == name:
+            entries[index] = (name, lines)
+            return
+    entries.append((name, lines))
+
+
+def insert_entry(
+    entries: List[Tuple[str, List[str]]], after: str, name: str, lines: List[str]
+) -> None:
+    for index, (entry_name, _) in enumerate(entries):
+        if entry_name == after:
+            entries.insert(index + 1, (name, lines))
+            return
+    entries.append((name, lines))
+
+
+def entry_dict(entries: Sequence[Tuple[str, List[str]]]) -> Dict[str, List[str]]:
+    return dict(entries)
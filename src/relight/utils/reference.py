@@ -0,0 +1,184 @@
+from typing import Dict, Iterable, Mapping, Sequence, Union
+
+import numpy as np
+
+from relight.model.definitions import (
+    COLLOR_COORECT_CAT,
+    COLOR_CORRECT_IDENTITY,
+    GRADE_CLAMP_IDENTITY,
+    GRADE_IDENTITY,
+    NodeType,
+)
+
+Value = Union[float, Sequence[float]]
+Settings = Mapping[str, Mapping[str, Value]]
+
+COLOR_CORRECT = f"{NodeType.COLOR_CORRECT.value}_0"
+GRADES = (f"{NodeType.GRADE.value}_0", f"{NodeType.GRADE.value}_1")
+
+LUMINANCE = np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)
+CONTRAST_PIVOT = 0.18
+SHADOWS_RANGE = (0.0, 0.09)
+HIGHLIGHTS_RANGE = (0.5, 1.0)
+
+MAX_BYTES = 1 << 30
+TEMPORARIES = 8
+
+
+def _color_correct_identity() -> Dict[str, float]:
+    identity = {}
+    for cc_ in COLLOR_COORECT_CAT:
+        knob_prefix = f"{cc_}." if not cc_ == "master" else ""
+        for kn_, value in COLOR_CORRECT_IDENTITY.items():
+            identity[knob_prefix + kn_] = value
+    return identity
+
+
+GRADE_CLAMPS: Dict[str, float] = {"black_clamp": 1.0, "white_clamp": 0.0}
+IDENTITY: Dict[str, Dict[str, float]] = {
+    COLOR_CORRECT: _color_correct_identity(),
+    GRADES[0]: {**GRADE_IDENTITY, **GRADE_CLAMP_IDENTITY},
+    GRADES[1]: {**GRADE_IDENTITY, **GRADE_CLAMP_IDENTITY},
+}
+# Knob defaults of new nodes, a Grade clamps black unless turned off
+DEFAULTS: Dict[str, Dict[str, float]] = {
+    COLOR_CORRECT: IDENTITY[COLOR_CORRECT],
+    GRADES[0]: {**GRADE_IDENTITY, **GRADE_CLAMPS},
+    GRADES[1]: {**GRADE_IDENTITY, **GRADE_CLAMPS},
+}
+
+
+def _stack(values: Iterable[Value], default: float) -> np.ndarray:
+    rows = []
+    for value in values:
+        rgb = np.asarray(default if value is None else value, dtype=np.float32)
+        rows.append(np.resize(rgb.ravel(), 3) if rgb.size < 3 else rgb.ravel()[:3])
+    return np.stack(rows)[:, None, None, :]
+
+
+def parameters(settings: Sequence[Settings]) -> Dict[str, Dict[str, np.ndarray]]:
+    params = {}
+    for node, defaults in DEFAULTS.items():
+        node_settings = [category.get(node, {}) for category in settings]
+        params[node] = {
+            kn_: _stack((values.get(kn_) for values in node_settings), default)
+            for kn_, default in defaults.items()
+        }
+        mix = _stack((values.get("mix") for values in node_settings), 1.0)
+        params[node]["mix"] = mix[..., :1]
+    return params
+
+
+def _is_identity(node_params: Mapping[str, np.ndarray], node: str) -> bool:
+    if not node_params["mix"].any():
+        return True
+    return all(
+        np.all(node_params[kn_] == value) for kn_, value in IDENTITY[node].items()
+    )
+
+
+def _power(rgb: np.ndarray, exponent: np.ndarray) -> np.ndarray:
+    if np.all(exponent == 1.0):
+        return rgb
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(rgb > 0.0, np.power(np.maximum(rgb, 0.0), exponent), rgb)
+
+
+def _mix(rgb: np.ndarray, out: np.ndarray, mix: np.ndarray) -> np.ndarray:
+    if np.all(mix == 1.0):
+        return out
+    return rgb + (out - rgb) * mix
+
+
+def _smoothstep(edge0: float, edge1: float, value: np.ndarray) -> np.ndarray:
+    t = np.clip((value - edge0) / (edge1 - edge0), 0.0, 1.0)
+    return t * t * (3.0 - 2.0 * t)
+
+
+def _luminance(rgb: np.ndarray) -> np.ndarray:
+    return np.einsum("...c,c->...", rgb, LUMINANCE)[..., None]
+
+
+def grade(rgb: np.ndarray, params: Mapping[str, np.ndarray]) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a = (
+            params["multiply"]
+            * (params["white"] - params["black"])
+            / (params["whitepoint"] - params["blackpoint"])
+        )
+        gamma = 1.0 / params["gamma"]
+    b = params["add"] + params["black"] - a * params["blackpoint"]
+    out = _power(rgb * a + b, gamma)
+    out = np.where(params["black_clamp"] > 0.0, np.maximum(out, 0.0), out)
+    out = np.where(params["white_clamp"] > 0.0, np.minimum(out, 1.0), out)
+    return _mix(rgb, out, params["mix"])
+
+
+def _color_correct_range(
+    rgb: np.ndarray, params: Mapping[str, np.ndarray], prefix: str
+) -> np.ndarray:
+    luminance = _luminance(rgb)
+    out = luminance + (rgb - luminance) * params[prefix + "saturation"]
+    out = _power(out / CONTRAST_PIVOT, params[prefix + "contrast"]) * CONTRAST_PIVOT
+    with np.errstate(divide="ignore"):
+        out = _power(out, 1.0 / params[prefix + "gamma"])
+    return out * params[prefix + "gain"] + params[prefix + "offset"]
+
+
+def color_correct(rgb: np.ndarray, params: Mapping[str, np.ndarray]) -> np.ndarray:
+    luminance = _luminance(rgb)
+    shadows = 1.0 - _smoothstep(*SHADOWS_RANGE, luminance)
+    highlights = _smoothstep(*HIGHLIGHTS_RANGE, luminance)
+    out = (
+        shadows * _color_correct_range(rgb, params, "shadows.")
+        + (1.0 - shadows - highlights) * _color_correct_range(rgb, params, "midtones.")
+        + highlights * _color_correct_range(rgb, params, "highlights.")
+    )
+    out = _color_correct_range(out, params, "")
+    return _mix(rgb, out, params["mix"])
+
+
+def relight(
+    tile: np.ndarray, params: Mapping[str, Mapping[str, np.ndarray]]
+) -> np.ndarray:
+    rgb = tile[..., :3]
+    for node, operation in (
+        (COLOR_CORRECT, color_correct),
+        (GRADES[0], grade),
+        (GRADES[1], grade),
+    ):
+        if not _is_identity(params[node], node):
+            rgb = operation(rgb, params[node])
+    if tile.shape[-1] > 3:
+        rgb = np.concatenate((rgb, tile[..., 3:]), axis=-1)
+    return rgb.sum(axis=0)
+
+
+def tile_rows(
+    categories: int, width: int, channels: int, max_bytes: int = MAX_BYTES
+) -> int:
+    row_bytes = categories * width * channels * 4 * TEMPORARIES
+    return max(1, max_bytes // row_bytes)
+
+
+def render(
+    layers: Sequence[np.ndarray],
+    settings: Sequence[Settings],
+    max_bytes: int = MAX_BYTES,
+) -> np.ndarray:
+    if not layers:
+        raise AttributeError("Could not render without category layers.")
+    if len(layers) != len(settings):
+        raise AttributeError(
+            f"Got {len(settings)} category settings for {len(layers)} layers."
+        )
+    height, width, channels = layers[0].shape
+    params = parameters(settings)
+    out = np.zeros((height, width, channels), dtype=np.float32)
+    rows = tile_rows(len(layers), width, channels, max_bytes)
+    for y in range(0, height, rows):
+        tile = np.stack(
+            [np.asarray(layer[y : y + rows], dtype=np.float32) for layer in layers]
+        )
+        out[y : y + rows] = relight(tile, params)
+    return out
@@ -1,7 +1,13 @@
-from typing import Dict, List, Tuple, Union
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple, Union
 
 import nuke
 
+from relight.utils import names
+
+ORIGIN_SUFFIX = "_Dot_0"
+
+_layer_cache: Dict[Pattern, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+
 
 def filter_predicate(
     name: str,
@@ -36,32 +42,72 @@ def filter_predicate(
     return include
 
 
-def find_workspace_nodes(
-    node_prefix: Union[None, str, List[str]] = None,
-    node_suffix: Union[None, str, List[str]] = None,
-) -> Dict[str, nuke.Node]:
-    nodescan = (
-        node
-        for node in nuke.allNodes()
-        if filter_predicate(node.name(), node_prefix, node_suffix)
-    )
-    workspace_nodes = {}
-    try:
-        node = next(nodescan)
-        workspace_nodes[node.name()] = node
-    except StopIteration:
-        return None
-
-    for node in nodescan:
-        workspace_nodes[node.name()] = node
-    return workspace_nodes
-
-
-def find_workspace_layer(
-    layer_prefix: Union[None, str, List[str]] = None,
-    layer_suffix: Union[None, str, List[str]] = None,
+def channel_layer(channels: Iterable[str]) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(channel.partition(".")[0] for channel in channels))
+
+
+def find_matching_layer(
+    matcher: Pattern, layers: Optional[Iterable[str]] = None
 ) -> Tuple[str, ...]:
-    return tuple(
-        layer for layer in nuke.layers() 
-        if filter_predicate(layer, layer_prefix, layer_suffix)
-    )
+    layers = tuple(nuke.layers() if layers is None else layers)
+    cached = _layer_cache.get(matcher)
+    if cached is not None and cached[0] == layers:
+        return cached[1]
+    matching = tuple(layer for layer in layers if matcher.search(layer))
+    _layer_cache[matcher] = (layers, matching)
+    return matching
+
+
+def dependency_map(nodes: Iterable[nuke.Node]) -> Dict[str, List[nuke.Node]]:
+    dependents = {}
+    for node in nodes:
+        for index in range(node.inputs()):
+            input_ = node.input(index)
+            if input_ is not None:
+                dependents.setdefault(input_.name(), []).append(node)
+    return dependents
+
+
+def find_node_chain(
+    origin: nuke.Node, prefix: str, dependents: Dict[str, List[nuke.Node]]
+) -> List[nuke.Node]:
+    chain = [origin]
+    seen = {origin.name()}
+    node = origin
+    while node is not None:
+        node = next(
+            (
+                nd
+                for nd in dependents.get(node.name(), ())
+                if not nd.name() in seen and names.split_node_name(nd.name(), prefix)
+            ),
+            None,
+        )
+        if node is not None:
+            chain.append(node)
+            seen.add(node.name())
+    return chain
+
+
+def find_workspace_categories(
+    input_node: nuke.Node, nodes: Optional[Iterable[nuke.Node]] = None
+) -> Dict[str, List[nuke.Node]]:
+    dependents = dependency_map(nuke.allNodes() if nodes is None else nodes)
+    categories = {}
+    origin = input_node
+    while origin is not None:
+        origin = next(
+            (
+                nd
+                for nd in dependents.get(origin.name(), ())
+                if nd.name().endswith(ORIGIN_SUFFIX)
+            ),
+            None,
+        )
+        if origin is None:
+            break
+        name = names.remove_suffix(origin.name(), ORIGIN_SUFFIX)
+        if name in categories:
+            break
+        categories[name] = find_node_chain(origin, f"{name}_", dependents)
+    return categories
@@ -0,0 +1,540 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+from relight.model import topology
+from relight.model.definitions import (
+    CHANNEL,
+    GRADE_CLAMP_IDENTITY,
+    XDIST,
+    XOFFSET,
+    YDIST,
+    NodeType,
+)
+from relight.model.spec import (
+    INPUT_NAME,
+    NAME,
+    ON_CREATE,
+    ON_DESTROY,
+    OUTPUT_NAME,
+    PROXY_INPUT_EXPRESSIONS,
+    PROXY_INPUT_NAME,
+    PROXY_INPUT_VALUES,
+    PROXY_KNOB,
+    PROXY_OUTPUT_EXPRESSIONS,
+    PROXY_OUTPUT_NAME,
+    PROXY_OUTPUT_VALUES,
+    STATE_KNOB,
+    RigSpec,
+    category_node_names,
+    decode_state,
+    encode_state,
+)
+from relight.utils import nk
+from relight.utils.nk import INDENT, Block
+
+Entries = List[Tuple[str, List[str]]]
+Node = Tuple[str, str, Entries]
+
+NODE_ORDER = [
+    node_type.value
+    for node_type in (
+        NodeType.DOT,
+        NodeType.SHUFFLE,
+        NodeType.CROP,
+        NodeType.COLOR_CORRECT,
+        NodeType.GRADE,
+        NodeType.MERGE,
+    )
+]
+NODE_CLASSES = {NodeType.MERGE.value: "Merge2"}
+POSITION_KNOBS = ("name", "inputs", "xpos", "ypos", "selected")
+FREE_NODES = ("BackdropNode", "StickyNote")
+INTERFACE_NODES = (INPUT_NAME, OUTPUT_NAME, PROXY_INPUT_NAME, PROXY_OUTPUT_NAME)
+NODE_INDENT = INDENT * 2
+JOURNAL = ".relight_batch.jsonl"
+
+
+def _node_type(name: str, prefix: str) -> Optional[Tuple[str, int]]:
+    if not name.startswith(prefix):
+        return None
+    node_type, _, number = name[len(prefix) :].rpartition("_")
+    if not node_type in NODE_ORDER or not number.isdigit():
+        return None
+    return node_type, int(number)
+
+
+def _chain_names(
+    name: str, nodes: Dict[str, Block], state: Dict[str, List[str]]
+) -> List[str]:
+    node_names = state.get(name, [])
+    if node_names and all(node_name in nodes for node_name in node_names):
+        return node_names
+    prefix = f"{name}_"
+    found = [node_name for node_name in nodes if _node_type(node_name, prefix)]
+    found.sort(
+        key=lambda node_name: (
+            NODE_ORDER.index(_node_type(node_name, prefix)[0]),
+            _node_type(node_name, prefix)[1],
+        )
+    )
+    default = category_node_names(name)
+    if found and found[0] == default[0] and found[-1] == default[-1]:
+        return found
+    return default
+
+
+def _is_rig_node(node_name: str) -> bool:
+    rest, _, number = node_name.rpartition("_")
+    name, _, node_type = rest.rpartition("_")
+    return bool(name) and node_type in NODE_ORDER and number.isdigit()
+
+
+def _unknown_nodes(nodes: Dict[str, Block]) -> List[str]:
+    return [
+        node_name
+        for node_name, block in nodes.items()
+        if not (
+            block.cls in FREE_NODES
+            or node_name in INTERFACE_NODES
+            or _is_rig_node(node_name)
+        )
+    ]
+
+
+def _default_entries(name: str, node_type: str) -> Entries:
+    if node_type == NodeType.SHUFFLE.value:
+        return [("in1", nk.knob_lines("in1", name, NODE_INDENT))]
+    if node_type == NodeType.MERGE.value:
+        return [("operation", nk.knob_lines("operation", "plus", NODE_INDENT))]
+    if node_type == NodeType.GRADE.value:
+        return [
+            (kn_, nk.knob_lines(kn_, enabled, NODE_INDENT))
+            for kn_, enabled in GRADE_CLAMP_IDENTITY.items()
+        ]
+    return []
+
+
+def _chain(
+    name: str, spec: RigSpec, nodes: Dict[str, Block], state: Dict[str, List[str]]
+) -> List[Node]:
+    prefix = f"{name}_"
+    values = spec.values.get(name, {})
+    chain = []
+    for node_name in _chain_names(name, nodes, state):
+        node_type = _node_type(node_name, prefix)[0]
+        if node_name in nodes:
+            block = nodes[node_name]
+            cls = block.cls
+            entries = [
+                entry for entry in block.entries if not entry[0] in POSITION_KNOBS
+            ]
+        else:
+            cls = NODE_CLASSES.get(node_type, node_type)
+            entries = _default_entries(name, node_type)
+        for knob_name, value in values.get(node_name[len(prefix) :], {}).items():
+            nk.set_entry(
+                entries, knob_name, nk.knob_lines(knob_name, value, NODE_INDENT)
+            )
+        chain.append((cls, node_name, entries))
+    return chain
+
+
+def _proxy_entries(
+    node_name: str,
+    nodes: Dict[str, Block],
+    values: Dict[str, Any],
+    expressions: Dict[str, str],
+) -> Entries:
+    block = nodes.get(node_name)
+    if block is not None and block.cls == "Reformat":
+        return [entry for entry in block.entries if not entry[0] in POSITION_KNOBS]
+    entries = [
+        (knob_name, nk.knob_lines(knob_name, value, NODE_INDENT))
+        for knob_name, value in values.items()
+    ]
+    entries.extend(
+        (knob_name, nk.expression_lines(knob_name, expression, NODE_INDENT))
+        for knob_name, expression in expressions.items()
+    )
+    return entries
+
+
+def _node(
+    cls: str,
+    name: str,
+    x: int,
+    y: int,
+    entries: Entries = (),
+    inputs: Optional[int] = None,
+) -> List[str]:
+    head: Entries = []
+    if inputs is not None:
+        head.append(("inputs", nk.knob_lines("inputs", inputs, NODE_INDENT)))
+    head.append(("name", nk.knob_lines("name", name, NODE_INDENT)))
+    tail = [
+        ("xpos", nk.knob_lines("xpos", x, NODE_INDENT)),
+        ("ypos", nk.knob_lines("ypos", y, NODE_INDENT)),
+    ]
+    return nk.node_lines(cls, head + list(entries) + tail, INDENT)
+
+
+def _post_order(children: Sequence[Sequence[int]], index: int) -> Iterator[int]:
+    for child in children[index]:
+        yield from _post_order(children, child)
+    yield index
+
+
+def rig_lines(
+    spec: RigSpec,
+    nodes: Dict[str, Block],
+    chains: Sequence[Sequence[Node]],
+    proxy: bool = False,
+) -> List[str]:
+    lines = _input_lines(nodes, proxy)
+    count = len(spec.categories)
+    if not count:
+        lines.extend(_output_lines(nodes, 0, 0, proxy))
+        return lines
+
+    for index, chain in enumerate(chains):
+        lines.extend(_chain_lines(index, chain[:1]))
+        lines.append(f"{INDENT}set N_origin_{index} [stack 0]")
+
+    children = topology.merge_children(spec.merge_mode, count)
+    root = topology.merge_root(spec.merge_mode, count)
+    for index in _post_order(children, root):
+        inputs = {
+            topology.merge_input(position): f"$N_merge_{child}"
+            for position, child in enumerate(children[index])
+        }
+        merge_inputs = max([0] + list(inputs))
+        for dest_input in reversed(range(1, merge_inputs + 1)):
+            lines.append(f"{INDENT}push {inputs.get(dest_input, 0)}")
+        lines.append(f"{INDENT}push $N_origin_{index}")
+        lines.extend(_chain_lines(index, chains[index], 1, 1 + merge_inputs))
+        lines.append(f"{INDENT}set N_merge_{index} [stack 0]")
+
+    rows = max(len(chain) for chain in chains)
+    lines.append(f"{INDENT}push $N_merge_{root}")
+    lines.extend(_output_lines(nodes, root * XDIST, rows * YDIST, proxy))
+    return lines
+
+
+def _input_lines(nodes: Dict[str, Block], proxy: bool) -> List[str]:
+    lines = []
+    for block in nodes.values():
+        if block.cls in FREE_NODES:
+            lines.extend(nk.node_lines(block.cls, block.entries, INDENT))
+    top = -2 * YDIST if proxy else -YDIST
+    lines.extend(_node("Input", INPUT_NAME, 0, top, inputs=0))
+    if proxy:
+        entries = _proxy_entries(
+            PROXY_INPUT_NAME, nodes, PROXY_INPUT_VALUES, PROXY_INPUT_EXPRESSIONS
+        )
+        lines.extend(_node("Reformat", PROXY_INPUT_NAME, 0, -YDIST, entries))
+    return lines
+
+
+def _chain_lines(
+    index: int, chain: Sequence[Node], first: int = 0, merge_inputs: int = 0
+) -> List[str]:
+    lines = []
+    for row in range(first, len(chain)):
+        cls, node_name, entries = chain[row]
+        inputs = merge_inputs if row == len(chain) - 1 and merge_inputs else None
+        x = index * XDIST + (XOFFSET if cls == "Dot" else 0)
+        lines.extend(_node(cls, node_name, x, row * YDIST, entries, inputs))
+    return lines
+
+
+def _output_lines(nodes: Dict[str, Block], x: int, y: int, proxy: bool) -> List[str]:
+    lines = []
+    if proxy:
+        entries = _proxy_entries(
+            PROXY_OUTPUT_NAME, nodes, PROXY_OUTPUT_VALUES, PROXY_OUTPUT_EXPRESSIONS
+        )
+        lines.extend(_node("Reformat", PROXY_OUTPUT_NAME, x, y, entries))
+        y += YDIST
+    lines.extend(_node("Output", OUTPUT_NAME, x, y))
+    return lines
+
+
+def _user_knob(entries: Entries, name: str, definition: str, value: Any) -> None:
+    value_lines = nk.knob_lines(name, value)
+    knob_names = nk.entry_dict(entries)
+    if name in knob_names:
+        nk.set_entry(entries, name, value_lines)
+    elif f"addUserKnob {name}" in knob_names:
+        nk.insert_entry(entries, f"addUserKnob {name}", name, value_lines)
+    else:
+        if not "addUserKnob tab_relight" in knob_names:
+            tab = f"{INDENT}addUserKnob {{20 tab_relight l Relight}}"
+            entries.append(("addUserKnob tab_relight", [tab]))
+        user_knob = f"{INDENT}addUserKnob {{{definition}}}"
+        entries.append((f"addUserKnob {name}", [user_knob]))
+        entries.append((name, value_lines))
+
+
+def _chain_script(entries: Entries, name: str, script: str) -> None:
+    value = nk.unquote(nk.entry_value(entries, name) or "")
+    if script in value:
+        return
+    value = f"{value}\n{script}" if value.strip() else script
+    nk.set_entry(entries, name, nk.knob_lines(name, value))
+
+
+def _group_entries(
+    entries: Entries, spec: RigSpec, chains: Sequence[Sequence[Node]]
+) -> Entries:
+    entries = list(entries)
+    _chain_script(entries, "onCreate", ON_CREATE)
+    _chain_script(entries, "onDestroy", ON_DESTROY)
+    modes = " ".join(topology.MERGE_MODES)
+    _user_knob(
+        entries,
+        topology.MERGE_MODE,
+        f"4 {topology.MERGE_MODE} l merge: M {{{modes}}}",
+        spec.merge_mode,
+    )
+    state = encode_state(
+        {
+            name: [node_name for _, node_name, _ in chain]
+            for name, chain in zip(spec.categories, chains)
+        }
+    )
+    _user_knob(entries, STATE_KNOB, f"1 {STATE_KNOB} +INVISIBLE", state)
+    return entries
+
+
+def _is_relight(block: Block) -> bool:
+    if block.cls != "Group":
+        return False
+    if block.value(STATE_KNOB) is not None:
+        return True
+    # piRelight_<n> from the plug-in, piRelight<n> from older batch runs
+    number = block.name[len(NAME) :]
+    number = number[1:] if number.startswith("_") else number
+    return block.name.startswith(NAME) and (not number or number.isdigit())
+
+
+def _layer_lines(lines: Sequence[str], spec: RigSpec) -> List[str]:
+    declared = {
+        line.split()[1].lstrip("{") for line in lines if line.startswith("add_layer {")
+    }
+    layer_lines = []
+    for name in spec.categories:
+        if not name in declared:
+            channels = " ".join(f"{name}.{channel}" for channel in CHANNEL)
+            layer_lines.append(f"add_layer {{{name} {channels}}}")
+    return layer_lines
+
+
+def _group_lines(
+    entries: Entries,
+    spec: RigSpec,
+    nodes: Dict[str, Block],
+    state: Dict[str, List[str]],
+) -> List[str]:
+    chains = [_chain(name, spec, nodes, state) for name in spec.categories]
+    # Proxy nodes stay once created, the proxy knob only disables them.
+    proxy = nk.entry_value(entries, PROXY_KNOB) in ("true", "1") or (
+        PROXY_INPUT_NAME in nodes and PROXY_OUTPUT_NAME in nodes
+    )
+    lines = nk.node_lines("Group", _group_entries(entries, spec, chains))
+    lines.extend(rig_lines(spec, nodes, chains, proxy))
+    return lines
+
+
+def _update_group(lines: List[str], block: Block, spec: RigSpec) -> None:
+    content_end = nk.group_end(lines, block.end)
+    nodes = {
+        node.name: node for node in nk.blocks(lines[block.end : content_end], INDENT)
+    }
+    unknown = _unknown_nodes(nodes)
+    if unknown:
+        raise AttributeError(
+            f"Group '{block.name}' contains nodes the rig would drop: {unknown}. "
+            "Update it in Nuke instead."
+        )
+    state = decode_state(nk.unquote(block.value(STATE_KNOB) or "")) or {}
+    lines[block.start : content_end] = _group_lines(block.entries, spec, nodes, state)
+
+
+def _insert_group(
+    lines: List[str], spec: RigSpec, input_name: Optional[str] = None
+) -> int:
+    root_blocks = list(nk.blocks(lines))
+    used = {block.name for block in root_blocks}
+    number = 0
+    while f"{NAME}_{number}" in used:
+        number += 1
+    x, y, inputs = 0, 0, 0
+    group: List[str] = []
+    if input_name is not None:
+        input_block = next(
+            (block for block in root_blocks if block.name == input_name), None
+        )
+        if input_block is None:
+            raise AttributeError(f"Could not find input node '{input_name}'.")
+        x = int(float(input_block.value("xpos") or 0))
+        y = int(float(input_block.value("ypos") or 0)) + 2 * YDIST
+        inputs = 1
+        lines.insert(input_block.end, "set N_relight_input [stack 0]")
+        group.append("push $N_relight_input")
+
+    entries: Entries = [
+        ("inputs", nk.knob_lines("inputs", inputs)),
+        ("name", nk.knob_lines("name", f"{NAME}_{number}")),
+        ("xpos", nk.knob_lines("xpos", x)),
+        ("ypos", nk.knob_lines("ypos", y)),
+    ]
+    group.extend(_group_lines(entries, spec, {}, {}))
+    group.append("end_group")
+    end = len(lines)
+    while end and not lines[end - 1]:
+        end -= 1
+    lines[end:end] = group
+    return end
+
+
+def apply_script(
+    text: str, spec: RigSpec, input_name: Optional[str] = None
+) -> Tuple[str, str]:
+    newline = "\r\n" if "\r\n" in text else "\n"
+    lines = text.split(newline)
+    groups = [block for block in nk.blocks(lines) if _is_relight(block)]
+    layer_lines = _layer_lines(lines, spec)
+    if groups:
+        for block in reversed(groups):
+            _update_group(lines, block, spec)
+        start = groups[0].start
+        if start and lines[start - 1].startswith("push "):
+            start -= 1
+        status = "updated"
+    else:
+        start = _insert_group(lines, spec, input_name)
+        status = "inserted"
+    lines[start:start] = layer_lines
+    new_text = newline.join(lines)
+    return new_text, status if new_text != text else "unchanged"
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def process(
+    path: str, spec_data: Dict[str, Any], input_name: Optional[str] = None
+) -> Tuple[str, str, str]:
+    with open(path, encoding="utf-8", newline="") as file:
+        text = file.read()
+    new_text, status = apply_script(text, RigSpec.from_dict(spec_data), input_name)
+    if status != "unchanged":
+        temp_path = f"{path}.relight"
+        with open(temp_path, "w", encoding="utf-8", newline="") as file:
+            file.write(new_text)
+        os.replace(temp_path, path)
+    return path, status, _digest(new_text)
+
+
+def _load_journal(path: str) -> Dict[str, Dict[str, str]]:
+    journal = {}
+    if not os.path.exists(path):
+        return journal
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            journal[entry["path"]] = entry
+    return journal
+
+
+def _is_done(entry: Optional[Dict[str, str]], config: str, path: str) -> bool:
+    if entry is None or entry["config"] != config or not os.path.exists(path):
+        return False
+    with open(path, encoding="utf-8", newline="") as file:
+        return _digest(file.read()) == entry["digest"]
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="relight_batch",
+        description="Insert or update piRelight groups in Nuke scripts.",
+    )
+    parser.add_argument(
+        "spec", help="JSON file with the merge_mode and the categories' knob values"
+    )
+    parser.add_argument("scripts", nargs="+", help="Nuke scripts to update in place")
+    parser.add_argument(
+        "--input", dest="input_name", help="node to connect new piRelight groups to"
+    )
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--journal", default=JOURNAL, help="progress journal")
+    parser.add_argument("--force", action="store_true", help="ignore the journal")
+    return parser.parse_args(argv)
+
+
+def _pending(args: argparse.Namespace, config: str) -> List[str]:
+    journal = {} if args.force else _load_journal(args.journal)
+    paths = list(dict.fromkeys(os.path.abspath(path) for path in args.scripts))
+    todo = [path for path in paths if not _is_done(journal.get(path), config, path)]
+    if len(todo) < len(paths):
+        print(f"Skipping {len(paths) - len(todo)} scripts done in a previous run.")
+    return todo
+
+
+def _record(
+    journal_file: TextIO, future: Future, path: str, config: str, progress: str
+) -> bool:
+    try:
+        _, status, digest = future.result()
+    except Exception as error:  # pylint: disable=broad-except
+        print(f"{progress} failed {path}: {error}", file=sys.stderr)
+        return False
+    entry = {"path": path, "config": config, "digest": digest}
+    journal_file.write(json.dumps(entry) + "\n")
+    journal_file.flush()
+    print(f"{progress} {status} {path}")
+    return True
+
+
+def _run(
+    todo: Sequence[str],
+    spec_data: Dict[str, Any],
+    config: str,
+    args: argparse.Namespace,
+) -> int:
+    failed = 0
+    with open(args.journal, "a", encoding="utf-8") as journal_file:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = {
+                pool.submit(process, path, spec_data, args.input_name): path
+                for path in todo
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                progress = f"[{done}/{len(todo)}]"
+                path = futures[future]
+                if not _record(journal_file, future, path, config, progress):
+                    failed += 1
+    return failed
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _parse_args(argv)
+    with open(args.spec, encoding="utf-8") as file:
+        spec_data = json.load(file)
+    RigSpec.from_dict(spec_data)
+    config = _digest(json.dumps([spec_data, args.input_name], sort_keys=True))
+    todo = _pending(args, config)
+    return 1 if _run(todo, spec_data, config, args) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
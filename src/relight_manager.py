@@ -1,59 +1,106 @@
-from typing import List, Optional, Tuple, Union
+import fnmatch
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
 import nuke
 
 import relight_node
-from relight.model import category_knobs
+from relight.model import (
+    category_knobs,
+    proxy,
+    pruning,
+    region,
+    solo,
+    state,
+    topology,
+)
 from relight.model.category import Category
-from relight.model.definitions import XDIST, NodeType, Point
+from relight.model.definitions import NodeType, Point
+from relight.model.layout import Layout
 from relight.model.primitive import Primitive
-from relight.utils import connect, names, place
-
-CATDIST: int = XDIST
+from relight.model.spec import RigSpec
+from relight.utils import connect, instrument, names, scan
 
 
 class Manager(Primitive):
-    layer: Optional[Tuple[str, ...]] = None
+    __slots__ = (
+        "_layer",
+        "_batch_depth",
+        "_rewire",
+        "_outer",
+        "nodes",
+        "input",
+        "output",
+    )
 
     def __init__(self, position: Point = Point(x=0, y=0)) -> None:
-        self.layer = relight_node.include_layer()
+        self._layer: Optional[Tuple[str, ...]] = None
+        self._batch_depth = 0
+        self._rewire: Set[str] = set()
         self.nodes = None
-        self.input, self.output = relight_node.interface()
+        self._outer: Optional[Tuple[nuke.Node, nuke.Node]] = None
+        self._interface()
         super().__init__("relight", position)
-        if self.has_categories():
-            categories = self.get_workspace_categories(self.input)
-            self.elements = {}
-            for cat in categories:
-                self.add_element(cat, Category.scan(cat))
-
-    @staticmethod
-    def get_workspace_categories(
-        input_node: nuke.Node, categories: Optional[List[str]] = None
-    ) -> List[str]:
+        categories = self._load_state()
         if categories is None:
-            categories = []
-        dependent_nodes = input_node.dependent()
-        origin_suffix = "_Dot_0"
-        origins = (
-            node for node in dependent_nodes if node.name().endswith(origin_suffix)
-        )
-        try:
-            input_ = next(origins)
-            category = names.remove_suffix(input_.name(), origin_suffix)
-            categories.append(category)
-            Manager.get_workspace_categories(input_, categories)
-        except StopIteration:
-            pass
+            categories = self._scan_workspace()
+        for name, nodes in categories.items():
+            self.add_element(name, Category.from_nodes(name, nodes))
+
+    def _interface(self) -> None:
+        self.input, self.output = relight_node.interface()
+        self._outer = None
+        proxy_nodes = proxy.nodes()
+        if proxy_nodes is not None:
+            self._outer = (self.input, self.output)
+            self.input, self.output = proxy_nodes
+
+    @property
+    def layer(self) -> Tuple[str, ...]:
+        if self._layer is None:
+            self._layer = relight_node.category_layer(nuke.thisNode())
+        return self._layer
+
+    def _load_state(self) -> Optional[Dict[str, List[nuke.Node]]]:
+        category_names = state.load(nuke.thisNode())
+        if category_names is None:
+            return None
+        categories = {}
+        for name, node_names in category_names.items():
+            nodes = [nuke.toNode(node_name) for node_name in node_names]
+            if not nodes or None in nodes:
+                return None
+            categories[name] = nodes
+        if not self._is_consistent(categories):
+            return None
         return categories
 
-    def has_categories(self) -> bool:
-        input_dependant = self.input.dependent()
-        if not input_dependant:
+    def _is_consistent(self, categories: Dict[str, List[nuke.Node]]) -> bool:
+        output_input = self.output.input(0)
+        if output_input is None:
             return False
-        if input_dependant:
-            if self.output.name() in (nd.name() for nd in input_dependant):
-                return False
-        return True
+        if not categories:
+            return output_input.name() == self.input.name()
+        chains = list(categories.values())
+        origin_input = chains[0][0].input(0)
+        root = chains[topology.merge_root(self.merge_mode, len(chains))]
+        output_src = root[-1]
+        soloed = solo.soloed(nuke.thisNode())
+        if soloed in categories:
+            output_src = Category.from_nodes(soloed, categories[soloed]).light
+        return (
+            origin_input is not None
+            and origin_input.name() == self.input.name()
+            and output_input.name() == output_src.name()
+        )
+
+    def _scan_workspace(self) -> Dict[str, List[nuke.Node]]:
+        return scan.find_workspace_categories(self.input)
+
+    def save_state(self) -> None:
+        categories = {category.name: list(category.node_names) for category in self}
+        state.save(nuke.thisNode(), categories)
 
     def _check_category(self, name: str) -> Category:
         if not name in self.elements:
@@ -61,22 +108,12 @@ class Manager(Primitive):
         return self.elements[name]
 
     def successor(self, category: Category) -> Union[None, Category]:
-        index = self.get_index(category.name)
-        if index is None:
-            return index
-        if len(self) > index + 1:
-            return self[index + 1]
-        return None
+        return self.next_element(category.name)
 
     def predecessor(self, category: Category) -> Union[None, Category]:
-        index = self.get_index(category.name)
-        if index is None:
-            return index
-        if index > 0:
-            return self[index - 1]
-        return None
+        return self.previous_element(category.name)
 
-    def add_category(self, name: str) -> Category:
+    def _check_layer(self, name: str) -> None:
         if not name in self.layer:
             err_msg = f"Could not add category '{name}'. Select category from:"
             for layer in self.layer:
@@ -84,77 +121,307 @@ class Manager(Primitive):
             raise AttributeError(err_msg)
         if name in self.elements:
             raise AttributeError(f"Category {name} already added.")
+
+    @contextmanager
+    def batch(self) -> Iterator["Manager"]:
+        start = time.perf_counter()
+        if not self._batch_depth:
+            nuke.Undo().begin()
+        self._batch_depth += 1
+        try:
+            yield self
+            if self._batch_depth == 1:
+                self.connect_origins(self._rewire)
+                self._rewire = set()
+                self.connect_merges()
+                self.layout()
+                self.save_state()
+        except Exception:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                # Roll back everything the failed batch changed.
+                nuke.Undo().cancel()
+                instrument.record_operation(
+                    instrument.BATCH_OPERATION, time.perf_counter() - start
+                )
+            raise
+        self._batch_depth -= 1
+        if not self._batch_depth:
+            nuke.Undo().end()
+            instrument.record_operation(
+                instrument.BATCH_OPERATION, time.perf_counter() - start
+            )
+
+    @property
+    def merge_mode(self) -> str:
+        knob = nuke.thisNode().knob(topology.MERGE_MODE)
+        return knob.value() if knob is not None else topology.MERGE_MODES[0]
+
+    def root_category(self) -> Optional[Category]:
+        if not len(self):
+            return None
+        return self[topology.merge_root(self.merge_mode, len(self))]
+
+    def layout(self) -> int:
+        if self._batch_depth > 1:
+            return 0
+        rig_layout = Layout(self._position)
+        root = self.root_category()
+        root_index = self.get_index(root.name) if root is not None else None
+        upstream, downstream = self._outer if self._outer else (None, None)
+        rig_layout.place_rig(
+            self.input, self.output, tuple(self), root_index, upstream, downstream
+        )
+        return rig_layout.apply()
+
+    @staticmethod
+    def _has_merge_end(category: Category) -> bool:
+        node_type = names.split_node_name(category.endnode.name(), category.prefix)
+        return node_type is not None and node_type[0] is NodeType.MERGE
+
+    def _merge_end(self, category: Category) -> nuke.Node:
+        if self._has_merge_end(category):
+            return category.endnode
+        # Rigs created before merge modes end their first category with a Dot.
+        node_type = names.split_node_name(category.endnode.name(), category.prefix)
+        if node_type is not None and node_type[0] is NodeType.DOT:
+            category.remove_node(*node_type)
+        merge = category.add_node(NodeType.MERGE)
+        merge["operation"].setValue("plus")
+        return merge
+
+    def connect_origins(self, category_names: Optional[Iterable[str]] = None) -> None:
+        category_names = None if category_names is None else set(category_names)
+        src_node = self.input
+        for category in self:
+            if category_names is None or category.name in category_names:
+                connect.reconnect_nodes(src_node, category.origin)
+            src_node = category.origin
+
+    def connect_merges(self) -> None:
+        categories = tuple(self)
+        if not categories:
+            connect.reconnect_nodes(self.input, self.output)
+            return
+        mode = self.merge_mode
+        children = topology.merge_children(mode, len(categories))
+        for category, child_indices in zip(categories, children):
+            if child_indices:
+                merge = self._merge_end(category)
+            elif self._has_merge_end(category):
+                merge = category.endnode
+            else:
+                continue
+            inputs = {
+                topology.merge_input(position): categories[index].endnode
+                for position, index in enumerate(child_indices)
+            }
+            last_input = max([merge.inputs() - 1] + list(inputs))
+            for dest_input in range(1, last_input + 1):
+                if dest_input != 2:
+                    src_node = inputs.get(dest_input, None)
+                    connect.reconnect_nodes(src_node, merge, dest_input)
+        root = categories[topology.merge_root(mode, len(categories))]
+        soloed = self.elements.get(solo.soloed(nuke.thisNode()))
+        output_src = root.endnode if soloed is None else soloed.light
+        connect.reconnect_nodes(output_src, self.output)
+
+    def _add_category(self, name: str) -> Category:
+        self._check_layer(name)
         new_category = self.add_element(name, Category(name))
-        if self.has_categories():
-            merge = new_category.add_node(NodeType.MERGE)
-            merge["operation"].setValue("plus")
-            predecessor = self.predecessor(new_category)
-            new_category.connect_start(predecessor.origin)
-            new_category.connect_end(self.output)
-            new_category.position = Point(x=predecessor.x0 + CATDIST, y=predecessor.y0)
-            connect.connect_nodes(predecessor.endnode, merge, 1)
-        else:
-            new_category.add_node(NodeType.DOT)
-            new_category._set_node_positions()
-            new_category.connect_start(self.input)
-            new_category.connect_end(self.output)
-            new_category.position = Point(x=self.x0, y=self.y0)
-            place.place_node_above(self.input, new_category.origin)
-
-        place.place_node_below(self.output, new_category.endnode)
+        self._rewire.add(name)
+        merge = new_category.add_node(NodeType.MERGE)
+        merge["operation"].setValue("plus")
+        root = nuke.thisNode()
+        if pruning.is_enabled(root):
+            pruning.prune(new_category)
+        # Cropping renders the category, only the region buttons do that.
+        new_category.set_rgb_only(region.rgb_only(root))
         return new_category
 
-    def remove_cateogry(self, name: str) -> None:
-        category = self._check_category(name)
+    def _remove_category(self, category: Category) -> None:
+        root = nuke.thisNode()
+        if solo.soloed(root) == category.name:
+            solo.set_soloed(root, "")
         successor = self.successor(category)
-        predecessor = self.predecessor(category)
+        if successor is not None:
+            self._rewire.add(successor.name)
+        category.remove()
+        self.remove_element(category.name)
 
-        if len(self) > 1:
-            place.move_node_in_x(self.output, -CATDIST)
+    def move_category(self, name: str, index: int) -> None:
+        self._check_category(name)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Could not move category '{name}' to {index}.")
+        current = self.get_index(name)
+        if current == index:
+            return
+        with self.batch():
+            order = list(self.elements)
+            order.insert(index, order.pop(current))
+            self.elements = {key: self.elements[key] for key in order}
+            # Origins from the first moved category up to the one after the last.
+            self._rewire.update(order[min(current, index) : max(current, index) + 2])
 
-        def _move_all_successors(cat: Category) -> None:
-            successor = self.successor(cat)
-            if successor is not None:
-                successor.move_nodes(xdist=-CATDIST)
-                _move_all_successors(successor)
+    def set_merge_mode(self, mode: str) -> None:
+        if not mode in topology.MERGE_MODES:
+            raise AttributeError(
+                f"Unknown merge mode '{mode}'. Select from: {topology.MERGE_MODES}"
+            )
+        root = nuke.thisNode()
+        with self.batch():
+            if root.knob(topology.MERGE_MODE).value() != mode:
+                root.knob(topology.MERGE_MODE).setValue(mode)
 
-        _move_all_successors(category)
-        category.remove()
-        if predecessor is None:
-            if successor is None:
-                connect.connect_nodes(self.input, self.output)
-                place.place_node_below(self.output, self.input)
-            else:
-                successor.remove_node(NodeType.MERGE, 0)
-                successor.add_node(NodeType.DOT)
-                successor._set_node_positions()
-                successor.connect_start(self.input)
-                successor.connect_end(self.output)
-                place.place_node_below(self.output, self[-1].endnode)
-        else:
-            if successor is None:
-                connect.connect_nodes(predecessor.endnode, self.output)
-                place.place_node_below(self.output, predecessor.endnode)
-            else:
-                predecessor.connect_start(successor.origin)
-                connect.connect_nodes(predecessor.endnode, successor.endnode, 1)
-                place.place_node_below(self.output, self[-1].endnode)
+    def add_category(self, name: str) -> Category:
+        with self.batch():
+            return self._add_category(name)
+
+    def remove_cateogry(self, name: str) -> None:
+        self.remove_categories([name])
+
+    def add_categories(self, category_names: Iterable[str]) -> List[Category]:
+        with self.batch():
+            return [self._add_category(name) for name in category_names]
+
+    def remove_categories(self, category_names: Iterable[str]) -> None:
+        with self.batch():
+            for category in [self._check_category(name) for name in category_names]:
+                self._remove_category(category)
+
+    def spec(self) -> RigSpec:
+        return RigSpec(
+            tuple(self.elements),
+            self.merge_mode,
+            {category.name: category_knobs.knob_values(category) for category in self},
+        )
+
+    def reconcile(self, spec: RigSpec) -> None:
+        root = nuke.thisNode()
+        with self.batch():
+            for category in [cat for cat in self if not cat.name in spec.categories]:
+                self.remove_category_knobs(category.name)
+                self._remove_category(category)
+            for name in spec.categories:
+                if not name in self.elements:
+                    self._add_category(name)
+                    self.add_category_knobs(name)
+            if tuple(self.elements) != spec.categories:
+                self.elements = {name: self.elements[name] for name in spec.categories}
+                self._rewire.update(spec.categories)
+            self.set_merge_mode(spec.merge_mode)
+            for name, values in spec.values.items():
+                self._check_category(name)
+                relight_node.apply_values(root, name, values)
 
     def add_category_knobs(self, name: str) -> None:
         category = self._check_category(name)
         root = nuke.thisNode()
+        if category_knobs.editor_mode(root):
+            category_knobs.bind_editor(root, name)
+            return
         root.setTab(0)
         category_knobs.add(name=name, root=root, category=category)
 
     def remove_category_knobs(self, name: str) -> None:
         self._check_category(name)
         root = nuke.thisNode()
+        if category_knobs.editor_mode(root):
+            if category_knobs.bound_category(root) == name:
+                category_knobs.bind_editor(root, "")
+            return
         category_knobs.remove(name, root)
 
+    def bind_editor(self, name: str) -> None:
+        root = nuke.thisNode()
+        category_knobs.bind_editor(root, name if name in self.elements else "")
+
+    def set_pruning(self, enabled: bool) -> None:
+        with self.batch():
+            for category in self:
+                pruning.prune(category, enabled)
+
+    def set_muted(self, category_names: Iterable[str], enabled: bool) -> None:
+        with self.batch():
+            for name in category_names:
+                category = self._check_category(name)
+                self._merge_end(category)
+                category.set_muted(enabled)
+
+    def set_solo(self, name: str) -> None:
+        if name:
+            self._check_category(name)
+        with self.batch():
+            solo.set_soloed(nuke.thisNode(), name)
+
+    def set_proxy(self, enabled: bool) -> None:
+        # The Reformats follow the proxy knob, they only have to exist.
+        if not enabled or self._outer is not None:
+            return
+        with self.batch():
+            self._outer = (self.input, self.output)
+            self.input, self.output = proxy.create(*self._outer)
+            if len(self):
+                self._rewire.add(self[0].name)
+
+    def set_category_region(
+        self, category_names: Iterable[str], rgb_only: bool, crop: str
+    ) -> None:
+        with self.batch():
+            for name in category_names:
+                region.restrict(self._check_category(name), rgb_only, crop)
+
+    def is_synced(self) -> bool:
+        root = nuke.thisNode()
+        categories = {category.name: list(category.node_names) for category in self}
+        if state.load(root) != categories:
+            return False
+        if category_knobs.editor_mode(root):
+            if not category_knobs.bound_category(root) in ("", *self.elements):
+                return False
+        elif set(category_knobs.block_names(root)) - set(self.elements) or any(
+            root.knob(category.name) is None for category in self
+        ):
+            return False
+        return not pruning.is_enabled(root) or all(
+            pruning.is_pruned(category) for category in self
+        )
+
+    def sync_knobs(self) -> None:
+        root = nuke.thisNode()
+        with self.batch():
+            if category_knobs.editor_mode(root):
+                self.bind_editor(category_knobs.bound_category(root))
+            else:
+                for name in category_knobs.block_names(root):
+                    if not name in self.elements:
+                        category_knobs.remove(name, root)
+                for category in self:
+                    if root.knob(category.name) is None:
+                        self.add_category_knobs(category.name)
+            if pruning.is_enabled(root):
+                for category in self:
+                    if not pruning.is_pruned(category):
+                        pruning.prune(category)
+
+    def switch_knob_mode(self) -> None:
+        root = nuke.thisNode()
+        with self.batch():
+            if category_knobs.editor_mode(root):
+                for category in self:
+                    category_knobs.remove(category.name, root)
+                self.bind_editor(self._get_selected_category())
+            else:
+                category_knobs.remove_editor(root)
+                for category in self:
+                    self.add_category_knobs(category.name)
+
     def _reset_categories(self):
         for category in self:
             category.remove()
         self.elements = {}
+        solo.set_soloed(nuke.thisNode(), "")
+        connect.connect_nodes(self.input, self.output)
 
     def _reset_knobs(self):
         root = nuke.thisNode()
@@ -162,32 +429,82 @@ class Manager(Primitive):
 
     def _reset_default(self):
         root = nuke.thisNode()
-        self.input, self.output = relight_node.interface()
+        self._interface()
         relight_node.knobs(root)
 
     @staticmethod
     def _get_selected_category() -> str:
         root = nuke.thisNode()
-        category_knob = root.knob("category")
+        category_knob = root.knob(relight_node.CATEGORY_KNOB)
         return category_knob.value()
 
+    def add_categories_button(self, category_names: Iterable[str]) -> None:
+        with self.batch():
+            category_names = list(category_names)
+            self.add_categories(category_names)
+            for name in category_names:
+                self.add_category_knobs(name)
+
+    def remove_categories_button(self, category_names: Iterable[str]) -> None:
+        with self.batch():
+            category_names = list(category_names)
+            for name in category_names:
+                self.remove_category_knobs(name)
+            self.remove_categories(category_names)
+
     def add_button(self) -> None:
-        nuke.Undo().begin()
-        category = self._get_selected_category()
-        self.add_category(category)
-        self.add_category_knobs(category)
-        nuke.Undo().end()
+        self.add_categories_button([self._get_selected_category()])
+
+    def add_all_button(self) -> None:
+        self.add_categories_button(
+            layer for layer in self.layer if not layer in self.elements
+        )
+
+    def add_matching_button(self) -> None:
+        root = nuke.thisNode()
+        pattern = root.knob("category_filter").value() or "*"
+        category_names = [
+            layer
+            for layer in self.layer
+            if fnmatch.fnmatchcase(layer, pattern) and not layer in self.elements
+        ]
+        self.add_categories_button(category_names)
+
+    def region_button(self) -> None:
+        self.set_category_region(
+            [self._get_selected_category()], *region.defaults(nuke.thisNode())
+        )
+
+    def region_all_button(self) -> None:
+        self.set_category_region(
+            [category.name for category in self], *region.defaults(nuke.thisNode())
+        )
+
+    def _move_selected(self, offset: int) -> None:
+        name = self._check_category(self._get_selected_category()).name
+        index = self.get_index(name) + offset
+        if 0 <= index < len(self):
+            self.move_category(name, index)
+
+    def move_up_button(self) -> None:
+        self._move_selected(-1)
+
+    def move_down_button(self) -> None:
+        self._move_selected(1)
+
+    def mute_button(self) -> None:
+        category = self._check_category(self._get_selected_category())
+        self.set_muted([category.name], not category.muted)
+
+    def solo_button(self) -> None:
+        name = self._get_selected_category()
+        self.set_solo("" if solo.soloed(nuke.thisNode()) == name else name)
 
     def remove_button(self) -> None:
-        nuke.Undo().begin()
-        category = self._get_selected_category()
-        self.remove_cateogry(category)
-        self.remove_category_knobs(category)
-        nuke.Undo().end()
+        self.remove_categories_button([self._get_selected_category()])
 
     def reset_button(self) -> None:
-        nuke.Undo().begin()
-        self._reset_default()
-        self._reset_knobs()
-        self._reset_categories()
-        nuke.Undo().end()
+        with self.batch():
+            self._reset_default()
+            self._reset_knobs()
+            self._reset_categories()
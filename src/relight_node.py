@@ -1,53 +1,153 @@
-from typing import Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import nuke
 
-from relight.utils import connect, place, scan
-from relight.utils.knobs import divider_knob, python_script_knob
+from relight.model import category_knobs, pruning, region, state, topology
+from relight.model.category import CROP_MODES, Category
+from relight.model.layout import Layout
+from relight.model.snapshot import ROWS, Snapshot, channel_values
+from relight.model.spec import (
+    INPUT_NAME,
+    NAME,
+    KNOB_CHANGED,
+    ON_CREATE,
+    ON_DESTROY,
+    OUTPUT_NAME,
+    PROXY_INPUT_NAME,
+    PROXY_KNOB,
+    PROXY_OUTPUT_NAME,
+    PROXY_SCALE_KNOB,
+    PROXY_WIDTH_KNOB,
+    KnobValues,
+)
+from relight.utils import (
+    connect,
+    exr,
+    instances,
+    instrument,
+    layer_match,
+    names,
+    place,
+    scan,
+)
+from relight.utils.knobs import chain_script, divider_knob, python_script_knob
 
-NAME = "piRelight"
 INCLUDE_LAYER = ["light", "Light", "LIGHT"]
+CATEGORY_KNOB = "category"
+LAYER_EVENTS = ("inputChange", "showPanel")
+HEADER_WORKERS = 4
+
+_header_pool: Optional[ThreadPoolExecutor] = None
 
 
 def new_name() -> str:
-    node_prefix = NAME
-    nodes_of_type = scan.find_workspace_nodes(node_prefix)
-    if nodes_of_type:
-        node_names_of_type = sorted(list(nodes_of_type.keys()))
-        last_name_of_type = node_names_of_type[-1]
-        last_node_number = last_name_of_type.split("_")[-1]
-        node_number = int(last_node_number) + 1
-    else:
-        node_number = 0
-    return f"{node_prefix}_{node_number}"
+    return names.registry().new_name(NAME)
 
 
 def interface() -> Tuple[nuke.Node, nuke.Node]:
-    input_name = "AOV"
-    input_scan = scan.find_workspace_nodes(node_prefix=input_name)
-    input_node = input_scan.get(input_name, None) if input_scan else None
+    created = False
+    input_node = nuke.toNode(INPUT_NAME)
     if input_node is None:
-        nuke.nodes.Input(name=input_name)
-        input_node = nuke.toNode(input_name)
+        input_node = nuke.nodes.Input(name=INPUT_NAME)
+        created = True
 
-    output_name = "Beauty"
-    output_scan = scan.find_workspace_nodes(node_prefix=output_name)
-    output_node = output_scan.get(output_name, None) if output_scan else None
+    output_node = nuke.toNode(OUTPUT_NAME)
     if output_node is None:
-        nuke.nodes.Output(name=output_name)
-        output_node = nuke.toNode(output_name)
+        output_node = nuke.nodes.Output(name=OUTPUT_NAME)
+        created = True
 
-    place.place_node_below(output_node, input_node)
+    if created:
+        place.place_node_below(output_node, input_node)
 
     return input_node, output_node
 
 
-def include_layer() -> Tuple[str, ...]:
-    return scan.find_workspace_layer(
-        layer_prefix=INCLUDE_LAYER, layer_suffix=INCLUDE_LAYER
+def include_layer(root: nuke.Node) -> Tuple[str, ...]:
+    input_node = root.input(0)
+    if input_node is None:
+        return ()
+    return scan.find_matching_layer(
+        layer_match.matcher(prefix=INCLUDE_LAYER, suffix=INCLUDE_LAYER),
+        scan.channel_layer(input_node.channels()),
     )
 
 
+def _upstream_reads(root: nuke.Node) -> List[nuke.Node]:
+    reads = []
+    seen = set()
+    stack = [root.input(0)]
+    while stack:
+        node = stack.pop()
+        if node is None or node.fullName() in seen:
+            continue
+        seen.add(node.fullName())
+        if node.Class() == "Read":
+            reads.append(node)
+        stack.extend(node.input(index) for index in range(node.inputs()))
+    return reads
+
+
+def _deliver_layer(root: nuke.Node, future: Future) -> None:
+    try:
+        root.fullName()
+        layers = future.result()
+    except (OSError, ValueError):
+        # The group is gone or the header is unreadable, the Read reports it.
+        return
+    refresh_layer(root, layers)
+
+
+def prefetch_layer(root: nuke.Node) -> None:
+    global _header_pool
+    if not nuke.GUI:
+        return
+    for read in _upstream_reads(root):
+        path = nuke.filename(read)
+        if not path or not path.lower().endswith(".exr"):
+            continue
+        if _header_pool is None:
+            _header_pool = ThreadPoolExecutor(HEADER_WORKERS)
+        future = _header_pool.submit(
+            exr.sequence_layer, path, int(read["first"].value())
+        )
+        future.add_done_callback(
+            lambda done: nuke.executeInMainThread(_deliver_layer, (root, done))
+        )
+
+
+def category_layer(root: nuke.Node) -> Tuple[str, ...]:
+    kn = root.knob(CATEGORY_KNOB)
+    return () if kn is None else tuple(kn.values())
+
+
+def refresh_layer(root: nuke.Node, header_layer: Tuple[str, ...] = ()) -> bool:
+    kn = root.knob(CATEGORY_KNOB)
+    if kn is None:
+        return False
+    previous = tuple(kn.values())
+    current = include_layer(root)
+    if header_layer:
+        matcher = layer_match.matcher(prefix=INCLUDE_LAYER, suffix=INCLUDE_LAYER)
+        current += tuple(
+            layer
+            for layer in header_layer
+            if matcher.search(layer) and not layer in current
+        )
+    # Layers of existing categories stay listed even when the input is gone.
+    current += tuple(layer for layer in state.load(root) or {} if not layer in current)
+    known = set(previous)
+    removed = known.difference(current)
+    added = [layer for layer in current if not layer in known]
+    if not removed and not added:
+        return False
+    selected = kn.value()
+    kn.setValues([layer for layer in previous if not layer in removed] + added)
+    if selected in current:
+        kn.setValue(selected)
+    return True
+
+
 def knobs(root: nuke.Node) -> None:
     knobs_ = root.knobs()
     # Relight Tab
@@ -56,14 +156,12 @@ def knobs(root: nuke.Node) -> None:
         root.addKnob(nuke.Tab_Knob(tab_kn_name, "Relight"))
 
     # Dropdown for category selection
-    layer = include_layer()
-    category_kn_name = "category"
-    if not category_kn_name in knobs_:
+    if not CATEGORY_KNOB in knobs_:
         root.addKnob(
-            nuke.CascadingEnumeration_Knob(category_kn_name, "select category:", layer)
+            nuke.CascadingEnumeration_Knob(
+                CATEGORY_KNOB, "select category:", include_layer(root)
+            )
         )
-    else:
-        knobs_.get(category_kn_name).setValues(list(layer))
 
     # Python category control buttons
     for button in ["add", "remove"]:
@@ -78,6 +176,28 @@ def knobs(root: nuke.Node) -> None:
         if not kn.name() in knobs_:
             root.addKnob(kn)
 
+    # Python batch category control
+    filter_kn_name = "category_filter"
+    if not filter_kn_name in knobs_:
+        kn = nuke.String_Knob(filter_kn_name, "match:", "*")
+        kn.setTooltip("Glob pattern used by 'add matching', e.g. '*key*'.")
+        root.addKnob(kn)
+
+    for button, tool_tip in [
+        ("add all", "Add all categories"),
+        ("add matching", "Add all categories matching the pattern"),
+    ]:
+        kn = python_script_knob(
+            label=button,
+            script=(
+                "from relight_manager import Manager\n"
+                f"man = Manager()\nman.{button.replace(' ', '_')}_button()"
+            ),
+            tool_tip=tool_tip,
+        )
+        if not kn.name() in knobs_:
+            root.addKnob(kn)
+
     # Python reset button
     kn = python_script_knob(
         label="reset",
@@ -93,11 +213,343 @@ def knobs(root: nuke.Node) -> None:
     if not kn.name() in knobs_:
         root.addKnob(kn)
 
+    # Category knob mode
+    if not category_knobs.KNOB_MODE in knobs_:
+        kn = nuke.Enumeration_Knob(
+            category_knobs.KNOB_MODE, "knobs:", category_knobs.KNOB_MODES
+        )
+        kn.setTooltip(
+            "tabs: one knob tab per category.\n"
+            "editor: one set of knobs bound to the selected category."
+        )
+        root.addKnob(kn)
+    if not topology.MERGE_MODE in knobs_:
+        kn = nuke.Enumeration_Knob(topology.MERGE_MODE, "merge:", topology.MERGE_MODES)
+        kn.setTooltip(
+            "chain: one Merge per category, each merged onto the previous.\n"
+            "tree: the category Merges form a balanced binary tree.\n"
+            "multi: the first category's Merge takes all others as A inputs."
+        )
+        root.addKnob(kn)
+    if not pruning.PRUNE_KNOB in knobs_:
+        kn = nuke.Boolean_Knob(pruning.PRUNE_KNOB, "prune identity nodes", True)
+        kn.setTooltip(
+            "Disable ColorCorrect and Grade nodes of a category while they leave "
+            "the image unchanged. A Grade also needs black clamp and white clamp "
+            "turned off."
+        )
+        kn.setFlag(nuke.STARTLINE)
+        root.addKnob(kn)
+    if not region.RGB_ONLY_KNOB in knobs_:
+        kn = nuke.Boolean_Knob(region.RGB_ONLY_KNOB, "rgb only")
+        kn.setTooltip("Shuffle, grade and merge the rgb channels only.")
+        kn.setFlag(nuke.STARTLINE)
+        root.addKnob(kn)
+    if not region.CROP_KNOB in knobs_:
+        kn = nuke.Enumeration_Knob(region.CROP_KNOB, "crop:", CROP_MODES)
+        kn.setTooltip(
+            "full: process the full frame.\n"
+            "auto: crop to the non-black area detected over the frame range.\n"
+            "Applied by the region buttons only, as auto renders each category "
+            "once."
+        )
+        root.addKnob(kn)
+    if not PROXY_KNOB in knobs_:
+        kn = nuke.Boolean_Knob(PROXY_KNOB, "proxy")
+        kn.setTooltip(
+            "Downsample the AOVs before the categories while working in the "
+            "viewer. Renders always process the full resolution."
+        )
+        kn.setFlag(nuke.STARTLINE)
+        root.addKnob(kn)
+    if not PROXY_SCALE_KNOB in knobs_:
+        kn = nuke.Double_Knob(PROXY_SCALE_KNOB, "scale")
+        kn.setValue(0.5)
+        kn.setRange(0.05, 1)
+        kn.setTooltip("Proxy resolution as a fraction of the AOV resolution.")
+        kn.clearFlag(nuke.STARTLINE)
+        root.addKnob(kn)
+    if not PROXY_WIDTH_KNOB in knobs_:
+        kn = nuke.Int_Knob(PROXY_WIDTH_KNOB, "width")
+        kn.setTooltip("Proxy width in pixels, overrides the scale unless 0.")
+        kn.clearFlag(nuke.STARTLINE)
+        root.addKnob(kn)
+    for button, tool_tip in [
+        ("region", "Apply rgb only and crop to the selected category"),
+        ("region all", "Apply rgb only and crop to all categories"),
+        ("move up", "Move the selected category one place up the merge order"),
+        ("move down", "Move the selected category one place down the merge order"),
+        ("mute", "Toggle the selected category out of the mix, keeping its values"),
+        ("solo", "Show only the selected category, press again to show all"),
+    ]:
+        kn = python_script_knob(
+            label=button,
+            script=(
+                "from relight_manager import Manager\n"
+                f"man = Manager()\nman.{button.replace(' ', '_')}_button()"
+            ),
+            tool_tip=tool_tip,
+        )
+        if not kn.name() in knobs_:
+            root.addKnob(kn)
+    for button, tool_tip in [
+        ("save snapshot", "Save the knob values of all categories to a JSON file"),
+        ("load snapshot", "Apply the knob values of a JSON snapshot"),
+    ]:
+        kn = python_script_knob(
+            label=button,
+            script=(
+                "import relight_node\n"
+                f"relight_node.{button.replace(' ', '_')}_button()"
+            ),
+            tool_tip=tool_tip,
+        )
+        if not kn.name() in knobs_:
+            root.addKnob(kn)
+    # Keep any callbacks already set on the group
+    chain_script(root.knob("knobChanged"), KNOB_CHANGED)
+    chain_script(root.knob("onCreate"), ON_CREATE)
+    chain_script(root.knob("onDestroy"), ON_DESTROY)
+
     # Divider knob
     kn = divider_knob("relight_divider")
     if not kn.name() in knobs_:
         root.addKnob(kn)
 
+    # Hidden Manager state
+    state.add_knob(root)
+
+    # Diagnostics tab, only while profiling
+    if instrument.is_enabled():
+        instrument.add_knobs(root)
+
+
+def knob_changed() -> None:
+    knob = nuke.thisKnob()
+    root = nuke.thisNode()
+    if knob.name() in LAYER_EVENTS:
+        refresh_layer(root)
+        if knob.name() == LAYER_EVENTS[0]:
+            prefetch_layer(root)
+    elif knob.name() == CATEGORY_KNOB and category_knobs.editor_mode(root):
+        from relight_manager import Manager
+
+        with root:
+            Manager().bind_editor(knob.value())
+    elif knob.name() == category_knobs.KNOB_MODE:
+        from relight_manager import Manager
+
+        with root:
+            Manager().switch_knob_mode()
+    elif knob.name() == topology.MERGE_MODE:
+        from relight_manager import Manager
+
+        with root:
+            Manager().set_merge_mode(knob.value())
+    elif knob.name() == pruning.PRUNE_KNOB:
+        from relight_manager import Manager
+
+        with root:
+            Manager().set_pruning(bool(knob.value()))
+    elif knob.name() == PROXY_KNOB:
+        from relight_manager import Manager
+
+        with root:
+            Manager().set_proxy(bool(knob.value()))
+
+
+def on_create() -> None:
+    root = nuke.thisNode()
+    instances.registry().add(root)
+    knobs(root)
+    refresh_layer(root)
+    from relight_manager import Manager
+
+    # Opening a script only repairs groups that are out of sync.
+    with root:
+        manager = Manager()
+        if not manager.is_synced():
+            manager.sync_knobs()
+
+
+def on_destroy() -> None:
+    instances.registry().discard(nuke.thisNode())
+
+
+def relight_groups() -> List[nuke.Node]:
+    return instances.registry().groups()
+
+
+def rig_interface(root: nuke.Node) -> Tuple[Optional[nuke.Node], ...]:
+    input_node = root.node(INPUT_NAME)
+    output_node = root.node(OUTPUT_NAME)
+    proxy_input = root.node(PROXY_INPUT_NAME)
+    proxy_output = root.node(PROXY_OUTPUT_NAME)
+    if proxy_input is None or proxy_output is None:
+        return input_node, output_node, None, None
+    return proxy_input, proxy_output, input_node, output_node
+
+
+def state_categories(root: nuke.Node) -> Dict[str, Category]:
+    category_names = state.load(root)
+    if category_names is None:
+        # Rigs without a saved state are scanned once.
+        input_node = rig_interface(root)[0]
+        if input_node is None:
+            return {}
+        chains = scan.find_workspace_categories(input_node, root.nodes())
+    else:
+        chains = {}
+        for name, node_names in category_names.items():
+            nodes = [root.node(node_name) for node_name in node_names]
+            if nodes and not None in nodes:
+                chains[name] = nodes
+    return {name: Category.from_nodes(name, nodes) for name, nodes in chains.items()}
+
+
+def _row_knob(root: nuke.Node, name: str, row: str) -> Optional[nuke.Knob]:
+    node_key, _, kn_ = row.partition(".")
+    node = root.node(f"{name}_{node_key}")
+    return None if node is None else node.knob(kn_)
+
+
+def snapshot(root: nuke.Node) -> Snapshot:
+    categories = state_categories(root)
+    snapshot_ = Snapshot(list(categories))
+    for name in categories:
+        for row in ROWS:
+            knob = _row_knob(root, name, row)
+            if knob is not None:
+                snapshot_.set(name, row, knob.value())
+    return snapshot_
+
+
+def _set_knob(knob: nuke.Knob, values: Tuple[float, ...]) -> bool:
+    current = knob.value()
+    size = knob.arraySize()
+    if size == 1 or len(set(values[:size])) == 1:
+        value: Any = values[0]
+    else:
+        value = list(values[:size])
+    if current == value or (
+        isinstance(current, list) and current == [value] * len(current)
+    ):
+        return False
+    if isinstance(value, list):
+        for index, item in enumerate(value):
+            knob.setValue(item, index)
+    else:
+        knob.setValue(value)
+    return True
+
+
+def apply_values(root: nuke.Node, name: str, values: KnobValues) -> int:
+    changed = 0
+    for node_key, knob_values in values.items():
+        for kn_, value in knob_values.items():
+            knob = _row_knob(root, name, f"{node_key}.{kn_}")
+            if knob is None:
+                raise AttributeError(
+                    f"Category '{name}' has no knob '{node_key}.{kn_}'."
+                )
+            changed += _set_knob(knob, channel_values(value))
+    return changed
+
+
+def apply_snapshot(
+    snapshot_: Snapshot, groups: Optional[Iterable[nuke.Node]] = None
+) -> int:
+    groups = relight_groups() if groups is None else groups
+    changed = 0
+    nuke.Undo().begin()
+    try:
+        for root in groups:
+            categories = state_categories(root)
+            for name in snapshot_.categories:
+                if not name in categories:
+                    continue
+                for row in ROWS:
+                    knob = _row_knob(root, name, row)
+                    if knob is not None:
+                        changed += _set_knob(knob, snapshot_.get(name, row))
+    finally:
+        nuke.Undo().end()
+    return changed
+
+
+def refresh_all(groups: Optional[Iterable[nuke.Node]] = None) -> int:
+    groups = relight_groups() if groups is None else groups
+    return sum(refresh_layer(root) for root in groups)
+
+
+def prune_all(
+    groups: Optional[Iterable[nuke.Node]] = None, enabled: Optional[bool] = None
+) -> None:
+    groups = relight_groups() if groups is None else groups
+    nuke.Undo().begin()
+    try:
+        for root in groups:
+            enabled_ = pruning.is_enabled(root) if enabled is None else enabled
+            for category in state_categories(root).values():
+                pruning.prune(category, enabled_)
+    finally:
+        nuke.Undo().end()
+
+
+def _merge_mode(root: nuke.Node) -> str:
+    knob = root.knob(topology.MERGE_MODE)
+    return knob.value() if knob is not None else topology.MERGE_MODES[0]
+
+
+def layout_all(groups: Optional[Iterable[nuke.Node]] = None) -> int:
+    groups = relight_groups() if groups is None else groups
+    moved = 0
+    nuke.Undo().begin()
+    try:
+        for root in groups:
+            input_node, output_node, upstream, downstream = rig_interface(root)
+            if input_node is None or output_node is None:
+                continue
+            categories = tuple(state_categories(root).values())
+            root_index = None
+            if categories:
+                root_index = topology.merge_root(_merge_mode(root), len(categories))
+            rig_layout = Layout()
+            rig_layout.place_rig(
+                input_node, output_node, categories, root_index, upstream, downstream
+            )
+            moved += rig_layout.apply()
+    finally:
+        nuke.Undo().end()
+    return moved
+
+
+def node_counts(
+    groups: Optional[Iterable[nuke.Node]] = None,
+) -> Dict[str, Dict[str, int]]:
+    groups = relight_groups() if groups is None else groups
+    counts = {}
+    for root in groups:
+        categories = state_categories(root)
+        counts[root.fullName()] = {
+            "categories": len(categories),
+            "category nodes": sum(len(category) for category in categories.values()),
+            "nodes": len(root.nodes()),
+        }
+    return counts
+
+
+def save_snapshot_button() -> None:
+    path = nuke.getFilename("Save relight snapshot", "*.json", type="save")
+    if path:
+        snapshot(nuke.thisNode()).save(path)
+
+
+def load_snapshot_button() -> None:
+    path = nuke.getFilename("Load relight snapshot", "*.json")
+    if path:
+        apply_snapshot(Snapshot.load(path), [nuke.thisNode()])
+
 
 def create() -> nuke.Node:
     node_name = new_name()
@@ -106,4 +558,6 @@ def create() -> nuke.Node:
         input_node, output_node = interface()
         connect.connect_nodes(input_node, output_node)
     knobs(root)
+    category_knobs.add_blocks_knob(root)
+    instances.registry().add(root)
     return root
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+# Without Nuke the tests run on the in-memory stand-in of the benchmarks.
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks"))
+
+# pylint: disable=wrong-import-position
+import nuke
+
+import relight_node
+
+LAYERS = ["key_light", "fill_light", "rim_light", "bounce_light"]
+
+
+@pytest.fixture
+def group() -> nuke.Node:
+    nuke.reset()
+    for name in LAYERS:
+        nuke.Layer(name, ["red", "green", "blue", "alpha"])
+    root = relight_node.create()
+    root.setInput(0, nuke.nodes.Read(name="aovs"))
+    relight_node.refresh_layer(root)
+    nuke.set_this(root)
+    with root:
+        yield root
+    nuke.set_this(None)
@@ -0,0 +1,193 @@
+import json
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+import relight_batch
+from relight.model.spec import (
+    PROXY_INPUT_NAME,
+    PROXY_OUTPUT_NAME,
+    STATE_KNOB,
+    RigSpec,
+    decode_state,
+)
+from relight.utils import nk
+
+SCRIPT = """Root {
+ inputs 0
+ name /shots/sh010.nk
+}
+Read {
+ inputs 0
+ name Read1
+ xpos 100
+ ypos -200
+}
+"""
+
+
+def _spec(categories, merge_mode: str = "chain") -> RigSpec:
+    return RigSpec.from_dict({"merge_mode": merge_mode, "categories": categories})
+
+
+def _rig(text: str) -> Dict[str, nk.Block]:
+    lines = text.split("\n")
+    group = next(block for block in nk.blocks(lines) if block.cls == "Group")
+    content = lines[group.end : nk.group_end(lines, group.end)]
+    return {block.name: block for block in nk.blocks(content, nk.INDENT)}
+
+
+def _state(text: str) -> Dict[str, List[str]]:
+    lines = text.split("\n")
+    group = next(block for block in nk.blocks(lines) if block.cls == "Group")
+    return decode_state(nk.unquote(group.value(STATE_KNOB)))
+
+
+def _insert(categories) -> str:
+    text, status = relight_batch.apply_script(SCRIPT, _spec(categories), "Read1")
+    assert status == "inserted"
+    return text
+
+
+def test_insert():
+    spec = RigSpec.from_dict(
+        {
+            "merge_mode": "tree",
+            "categories": {"key_light": {"Grade_0": {"multiply": 2}}, "rim_light": {}},
+        }
+    )
+    text, status = relight_batch.apply_script(SCRIPT, spec, "Read1")
+    assert status == "inserted"
+    assert text.startswith(SCRIPT)
+    assert "add_layer {key_light key_light.red" in text
+    assert " name piRelight_0" in text
+    nodes = _rig(text)
+    assert nodes["key_light_Grade_0"].value("multiply") == "2"
+    assert nodes["key_light_Shuffle2_0"].value("in1") == "key_light"
+    assert nodes["rim_light_Merge_0"].value("operation") == "plus"
+    assert list(_state(text)) == ["key_light", "rim_light"]
+    assert relight_batch.apply_script(text, spec) == (text, "unchanged")
+
+
+def test_renamed_group():
+    text = _insert(["key_light"]).replace("piRelight_0", "other")
+    text, status = relight_batch.apply_script(text, _spec(["rim_light"]))
+    assert status == "updated"
+    assert " name other" in text
+    assert list(_state(text)) == ["rim_light"]
+
+
+def test_update_keeps_values():
+    text = _insert(["key_light", "fill_light", "rim_light"])
+    text = text.replace(
+        "  name rim_light_Grade_0\n", "  name rim_light_Grade_0\n  multiply 3\n"
+    )
+    text, status = relight_batch.apply_script(text, _spec(["rim_light", "key_light"]))
+    assert status == "updated"
+    nodes = _rig(text)
+    assert nodes["rim_light_Grade_0"].value("multiply") == "3"
+    assert not any(name.startswith("fill_light") for name in nodes)
+    assert list(_state(text)) == ["rim_light", "key_light"]
+    assert nodes["rim_light_Dot_0"].value("xpos") == "34"
+    assert nodes["key_light_Dot_0"].value("xpos") == "284"
+    assert relight_batch.apply_script(text, _spec(["rim_light", "key_light"]))[1] == (
+        "unchanged"
+    )
+
+
+def test_update_keeps_proxy():
+    text = _insert(["key_light"]).replace(
+        " addUserKnob {20 tab_relight l Relight}",
+        " addUserKnob {20 tab_relight l Relight}\n"
+        " addUserKnob {6 proxy +STARTLINE}\n"
+        " proxy true",
+    )
+    text, _ = relight_batch.apply_script(text, _spec(["key_light"]))
+    nodes = _rig(text)
+    assert nodes[PROXY_INPUT_NAME].cls == nodes[PROXY_OUTPUT_NAME].cls == "Reformat"
+    text = text.replace(
+        f"  name {PROXY_INPUT_NAME}\n", f"  name {PROXY_INPUT_NAME}\n  label scaled\n"
+    )
+    text, _ = relight_batch.apply_script(
+        text.replace(" proxy true", " proxy false"), _spec(["key_light", "rim_light"])
+    )
+    nodes = _rig(text)
+    assert PROXY_OUTPUT_NAME in nodes
+    assert nodes[PROXY_INPUT_NAME].value("label") == "scaled"
+
+
+def test_refuse_foreign_nodes():
+    text = _insert(["key_light"]).replace(
+        " Input {", " Blur {\n  inputs 0\n  name Blur1\n }\n Input {"
+    )
+    with pytest.raises(AttributeError):
+        relight_batch.apply_script(text, _spec(["key_light"]))
+
+
+def test_keep_free_nodes():
+    text = _insert(["key_light"]).replace(
+        " Input {", " StickyNote {\n  inputs 0\n  name StickyNote1\n }\n Input {"
+    )
+    text, _ = relight_batch.apply_script(text, _spec(["rim_light"]))
+    assert "StickyNote1" in _rig(text)
+
+
+def test_braces_in_quotes():
+    text = _insert(["key_light"]).replace(
+        " name piRelight_0\n", ' name piRelight_0\n label "\\"{"\n'
+    )
+    text, _ = relight_batch.apply_script(text, _spec(["rim_light"]))
+    assert text.count("\n onCreate ") == 1
+    assert text.count(f"\n {STATE_KNOB} ") == 1
+    assert relight_batch.apply_script(text, _spec(["rim_light"]))[1] == "unchanged"
+
+
+@pytest.mark.parametrize(
+    "value", ["key_light", "a b", "[value x]", "$gui", 'say "hi"', "a\nb", "c:\\tmp\\"]
+)
+def test_quote_round_trip(value: str):
+    quoted = nk.quote(value)
+    assert nk.unquote(quoted) == value
+    assert "\n" not in quoted
+    entries = nk._entries([f" label {quoted}", " note_font Verdana"])
+    assert [name for name, _ in entries] == ["label", "note_font"]
+
+
+def test_main_journal(tmp_path: Path, capsys: pytest.CaptureFixture):
+    spec = tmp_path / "spec.json"
+    spec.write_text(json.dumps({"merge_mode": "chain", "categories": ["key_light"]}))
+    scripts = [tmp_path / "sh010.nk", tmp_path / "sh020.nk"]
+    for script in scripts:
+        script.write_text(SCRIPT)
+    journal = tmp_path / "journal.jsonl"
+    argv = [str(spec), *map(str, scripts), "--journal", str(journal), "--jobs", "1"]
+
+    assert relight_batch.main(argv + ["--input", "Read1"]) == 0
+    assert capsys.readouterr().out.count("inserted") == 2
+    assert relight_batch.main(argv + ["--input", "Read1"]) == 0
+    assert "Skipping 2 scripts" in capsys.readouterr().out
+
+    # An edited script and a changed config are processed again.
+    scripts[0].write_text(SCRIPT)
+    assert relight_batch.main(argv + ["--input", "Read1"]) == 0
+    out = capsys.readouterr().out
+    assert "Skipping 1 scripts" in out and "inserted" in out
+    assert relight_batch.main(argv) == 0
+    assert capsys.readouterr().out.count("unchanged") == 2
+    assert relight_batch.main(argv + ["--force"]) == 0
+    assert "Skipping" not in capsys.readouterr().out
+
+
+def test_main_failure(tmp_path: Path, capsys: pytest.CaptureFixture):
+    spec = tmp_path / "spec.json"
+    spec.write_text(json.dumps({"merge_mode": "chain", "categories": ["key_light"]}))
+    script = tmp_path / "sh010.nk"
+    script.write_text(SCRIPT)
+    journal = tmp_path / "journal.jsonl"
+    argv = [str(spec), str(script), "--journal", str(journal), "--jobs", "1"]
+    assert relight_batch.main(argv + ["--input", "Missing"]) == 1
+    assert "failed" in capsys.readouterr().err
+    assert not journal.read_text()
+    assert relight_batch.main(argv + ["--input", "Read1"]) == 0
+    assert "inserted" in capsys.readouterr().out
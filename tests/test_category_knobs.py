@@ -0,0 +1,45 @@
+import json
+from typing import List
+
+import nuke
+
+from relight.model import category_knobs
+from relight_manager import Manager
+
+
+def _knob_names(group: nuke.Node) -> List[str]:
+    return [knob.name() for knob in group.allKnobs()]
+
+
+def _add(group: nuke.Node) -> List[str]:
+    Manager().add_categories_button(["key_light", "rim_light"])
+    group.addKnob(nuke.Double_Knob("user_gain"))
+    return _knob_names(group)
+
+
+def test_remove(group: nuke.Node):
+    names = _add(group)
+    category_knobs.remove("key_light", group)
+    assert _knob_names(group) == (
+        names[: names.index("key_light")] + names[names.index("rim_light") :]
+    )
+    category_knobs.remove("rim_light", group)
+    assert _knob_names(group) == names[: names.index("key_light")] + ["user_gain"]
+
+
+def test_remove_stale_block(group: nuke.Node):
+    names = _add(group)
+    group[category_knobs.KNOB_BLOCKS].setValue(json.dumps({"key_light": [0, 2]}))
+    category_knobs.remove("key_light", group)
+    assert _knob_names(group) == (
+        names[: names.index("key_light")] + names[names.index("rim_light") :]
+    )
+
+
+def test_remove_without_end_marker(group: nuke.Node):
+    names = _add(group)
+    group.removeKnob(group.allKnobs()[len(names) - 2])
+    group[category_knobs.KNOB_BLOCKS].setValue("{}")
+    category_knobs.remove("rim_light", group)
+    begin = names.index("rim_light")
+    assert _knob_names(group) == names[:begin] + names[begin + 1 : -2] + ["user_gain"]
@@ -0,0 +1,102 @@
+import struct
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from relight.utils import exr
+
+VERSION = 2
+
+
+def _attribute(name: str, attribute_type: str, data: bytes) -> bytes:
+    return (
+        name.encode()
+        + b"\0"
+        + attribute_type.encode()
+        + b"\0"
+        + struct.pack("<i", len(data))
+        + data
+    )
+
+
+def _channels(names: List[str]) -> bytes:
+    data = b"".join(
+        name.encode() + b"\0" + struct.pack("<iBBBBii", 2, 0, 0, 0, 0, 1, 1)
+        for name in names
+    )
+    return _attribute("channels", "chlist", data + b"\0")
+
+
+def _write(path: Path, version: int, *headers: bytes) -> str:
+    data = struct.pack("<ii", exr.MAGIC, version) + b"".join(
+        header + b"\0" for header in headers
+    )
+    if version & exr.MULTI_PART:
+        data += b"\0"
+    path.write_bytes(data + bytes(64))
+    return str(path)
+
+
+def test_single_part(tmp_path: Path):
+    header = _channels(["R", "G", "B", "key.red", "key.green", "fill.blue"])
+    header += _attribute("compression", "compression", b"\x03")
+    path = _write(tmp_path / "single.exr", VERSION, header)
+    headers = exr.read_headers(path)
+    assert headers == [
+        {"channels": ["R", "G", "B", "key.red", "key.green", "fill.blue"]}
+    ]
+    assert exr.channel_layer(headers) == ("key", "fill")
+
+
+def test_multi_part(tmp_path: Path):
+    beauty = _attribute("name", "string", b"beauty") + _channels(["R", "G", "B"])
+    key = _attribute("name", "string", b"key") + _channels(["R", "G", "B"])
+    rim = _attribute("name", "string", b"rim") + _channels(["rim.red"])
+    path = _write(tmp_path / "multi.exr", VERSION | exr.MULTI_PART, beauty, key, rim)
+    headers = exr.read_headers(path)
+    assert [header["name"] for header in headers] == ["beauty", "key", "rim"]
+    assert exr.channel_layer(headers) == ("beauty", "key", "rim")
+
+
+def test_not_exr(tmp_path: Path):
+    path = tmp_path / "image.exr"
+    path.write_bytes(bytes(16))
+    with pytest.raises(ValueError):
+        exr.read_headers(str(path))
+
+
+@pytest.mark.parametrize("size", [-1, exr.MAX_ATTRIBUTE_SIZE + 1, 1 << 20])
+def test_invalid_attribute_size(tmp_path: Path, size: int):
+    header = b"channels\0chlist\0" + struct.pack("<i", size)
+    path = _write(tmp_path / "broken.exr", VERSION, header)
+    with pytest.raises(ValueError):
+        exr.read_headers(path)
+
+
+def test_name_too_long(tmp_path: Path):
+    path = tmp_path / "broken.exr"
+    path.write_bytes(struct.pack("<ii", exr.MAGIC, VERSION) + b"a" * exr.CHUNK_SIZE)
+    with pytest.raises(ValueError):
+        exr.read_headers(str(path))
+
+
+def test_truncated(tmp_path: Path):
+    path = tmp_path / "truncated.exr"
+    path.write_bytes(struct.pack("<ii", exr.MAGIC, VERSION) + b"channels\0chl")
+    with pytest.raises(ValueError):
+        exr.read_headers(str(path))
+
+
+def test_frame_path():
+    assert exr.frame_path("render.%04d.exr", 7) == "render.0007.exr"
+    assert exr.frame_path("render.%d.exr", 7) == "render.7.exr"
+    assert exr.frame_path("render.###.exr", 12) == "render.012.exr"
+    assert exr.frame_path("render.exr", 12) == "render.exr"
+
+
+def test_sequence_layer(tmp_path: Path):
+    _write(tmp_path / "render.0002.exr", VERSION, _channels(["spec.red"]))
+    pattern = str(tmp_path / "render.####.exr")
+    assert exr.sequence_layer(pattern, 1) == ("spec",)
+    assert exr.sequence_layer(pattern, 10) == ()
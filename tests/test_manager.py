@@ -0,0 +1,138 @@
+from typing import List
+
+import nuke
+import pytest
+
+from relight.model import state, topology
+from relight.model.category import Category
+from relight.model.definitions import NodeType
+from relight.model.spec import INPUT_NAME, OUTPUT_NAME, RigSpec
+from relight_manager import Manager
+
+LIGHTS = ["key_light", "fill_light", "rim_light", "bounce_light"]
+
+
+def _merge(category: Category) -> nuke.Node:
+    return category.get_node(NodeType.MERGE, 0)
+
+
+def _multiply(group: nuke.Node, name: str) -> List[float]:
+    return group.node(f"{name}_Grade_0")["multiply"].value()
+
+
+def _check_graph(group: nuke.Node) -> None:
+    manager = Manager()
+    categories = list(manager)
+    names = [category.name for category in categories]
+    assert list(state.load(group)) == names
+    src_node = group.node(INPUT_NAME)
+    for category in categories:
+        assert category.origin.input(0) is src_node
+        src_node = category.origin
+    mode = manager.merge_mode
+    children = topology.merge_children(mode, len(names))
+    for category, child_indices in zip(categories, children):
+        for position, index in enumerate(child_indices):
+            merge_input = _merge(category).input(topology.merge_input(position))
+            assert merge_input is _merge(categories[index])
+    root = categories[topology.merge_root(mode, len(names))]
+    assert group.node(OUTPUT_NAME).input(0) is _merge(root)
+
+
+@pytest.mark.parametrize("mode", topology.MERGE_MODES)
+def test_merge_modes(group: nuke.Node, mode: str):
+    Manager().add_categories(LIGHTS)
+    Manager().set_merge_mode(mode)
+    _check_graph(group)
+    for other in topology.MERGE_MODES:
+        Manager().set_merge_mode(other)
+        _check_graph(group)
+
+
+def test_reconcile(group: nuke.Node):
+    Manager().add_categories(LIGHTS[:3])
+    group.node("key_light_Grade_0")["multiply"].setValue(2.0)
+    spec = RigSpec.from_dict(
+        {
+            "merge_mode": "tree",
+            "categories": {
+                "rim_light": {},
+                "key_light": {},
+                "bounce_light": {"Grade_0": {"multiply": 3}},
+            },
+        }
+    )
+    Manager().reconcile(spec)
+    assert list(Manager().elements) == ["rim_light", "key_light", "bounce_light"]
+    assert group.node("fill_light_Dot_0") is None
+    assert _multiply(group, "key_light") == [2.0] * 4
+    assert _multiply(group, "bounce_light") == [3.0] * 4
+    assert group[topology.MERGE_MODE].value() == "tree"
+    assert group.knob("bounce_light") is not None
+    assert group.knob("fill_light") is None
+    _check_graph(group)
+    assert Manager().spec().categories == spec.categories
+
+    nuke.calls.clear()
+    Manager().reconcile(spec)
+    assert not nuke.calls["createNode"] and not nuke.calls["delete"]
+
+
+def test_reconcile_unknown_knob(group: nuke.Node):
+    Manager().add_categories(LIGHTS[:2])
+    spec = RigSpec.from_dict(
+        {"categories": {"key_light": {"Grade_0": {"unknown": 1}}, "rim_light": {}}}
+    )
+    nuke.calls.clear()
+    with pytest.raises(AttributeError):
+        Manager().reconcile(spec)
+    assert nuke.calls["Undo.cancel"] == 1
+    assert not nuke.calls["Undo.end"]
+    assert list(state.load(group)) == LIGHTS[:2]
+
+
+def test_move_category(group: nuke.Node):
+    Manager().add_categories(LIGHTS)
+    group.node("rim_light_Grade_0")["multiply"].setValue(2.0)
+    Manager().move_category("rim_light", 0)
+    assert list(Manager().elements) == [
+        "rim_light",
+        "key_light",
+        "fill_light",
+        "bounce_light",
+    ]
+    assert _multiply(group, "rim_light") == [2.0] * 4
+    _check_graph(group)
+    Manager().move_category("rim_light", 3)
+    assert list(Manager().elements)[-1] == "rim_light"
+    _check_graph(group)
+    with pytest.raises(IndexError):
+        Manager().move_category("rim_light", 4)
+    with pytest.raises(AttributeError):
+        Manager().move_category("spec_light", 0)
+
+
+def test_mute(group: nuke.Node):
+    Manager().add_categories(LIGHTS[:2])
+    Manager().set_muted(["fill_light"], True)
+    assert Manager().elements["fill_light"].muted
+    assert not Manager().elements["key_light"].muted
+    assert _merge(Manager().elements["fill_light"])["Bchannels"].value() == "none"
+    _check_graph(group)
+    Manager().set_muted(["fill_light"], False)
+    assert not Manager().elements["fill_light"].muted
+    assert _merge(Manager().elements["fill_light"])["Bchannels"].value() == "rgba"
+
+
+def test_solo(group: nuke.Node):
+    Manager().add_categories(LIGHTS[:3])
+    output = group.node(OUTPUT_NAME)
+    Manager().set_solo("fill_light")
+    assert output.input(0) is group.node("fill_light_Grade_1")
+    Manager().set_solo("")
+    _check_graph(group)
+    Manager().set_solo("rim_light")
+    Manager().remove_categories(["rim_light"])
+    _check_graph(group)
+    with pytest.raises(AttributeError):
+        Manager().set_solo("spec_light")
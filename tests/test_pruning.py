@@ -0,0 +1,46 @@
+import re
+from typing import Any
+
+import nuke
+import pytest
+
+from relight.model.definitions import NodeType
+from relight_manager import Manager
+
+TERM = re.compile(r"([\w.]+)==(-?[\d.]+)")
+CHANNELS = "rgba"
+
+
+def _knob_value(node: nuke.Node, name: str) -> Any:
+    knob_name, _, channel = name.rpartition(".")
+    if knob_name and channel in CHANNELS:
+        return node[knob_name].value(CHANNELS.index(channel))
+    return node[name].value()
+
+
+def _is_disabled(node: nuke.Node) -> bool:
+    disable = node["disable"]
+    if not disable.hasExpression():
+        return bool(disable.value())
+    # The identity expressions are "a==0 || (b==1 && c==0 && ...)".
+    return any(
+        all(
+            _knob_value(node, name) == float(value)
+            for name, value in TERM.findall(alternative)
+        )
+        for alternative in disable.animations()[0].split("||")
+    )
+
+
+@pytest.mark.usefixtures("group")
+def test_new_category_is_pruned():
+    category = Manager().add_category("key_light")
+    graded = [
+        category.get_node(NodeType.COLOR_CORRECT, 0),
+        category.get_node(NodeType.GRADE, 0),
+        category.get_node(NodeType.GRADE, 1),
+    ]
+    assert all(_is_disabled(node) for node in graded)
+    graded[2]["multiply"].setValue(2.0)
+    assert not _is_disabled(graded[2])
+    assert _is_disabled(graded[1])
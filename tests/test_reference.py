@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from relight.utils import reference
+
+COLOR_CORRECT = reference.COLOR_CORRECT
+GRADE = reference.GRADES[0]
+
+
+def _layer(seed: int = 0, height: int = 6, width: int = 5) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0.0, 2.0, size=(height, width, 4)).astype(np.float32)
+
+
+def test_identity_sums_layers():
+    layers = [_layer(0), _layer(1)]
+    out = reference.render(layers, [{}, {}])
+    np.testing.assert_allclose(out, layers[0] + layers[1], rtol=1e-6)
+
+
+def test_multiply():
+    layer = _layer()
+    out = reference.render([layer], [{GRADE: {"multiply": 2.0}}])
+    np.testing.assert_allclose(out[..., :3], layer[..., :3] * 2.0, rtol=1e-6)
+    np.testing.assert_allclose(out[..., 3], layer[..., 3])
+
+
+def test_multiply_per_channel():
+    layer = _layer()
+    out = reference.render([layer], [{GRADE: {"multiply": [1.0, 2.0, 3.0, 1.0]}}])
+    expected = layer[..., :3] * [1.0, 2.0, 3.0]
+    np.testing.assert_allclose(out[..., :3], expected, rtol=1e-6)
+
+
+def test_mix():
+    layer = _layer()
+    out = reference.render([layer], [{GRADE: {"multiply": 3.0, "mix": 0.5}}])
+    np.testing.assert_allclose(out[..., :3], layer[..., :3] * 2.0, rtol=1e-6)
+
+
+def test_mix_zero_is_identity():
+    layer = _layer()
+    out = reference.render([layer], [{GRADE: {"multiply": 3.0, "mix": 0.0}}])
+    np.testing.assert_allclose(out, layer, rtol=1e-6)
+
+
+def test_gain():
+    layer = _layer()
+    out = reference.render([layer], [{COLOR_CORRECT: {"gain": 2.0}}])
+    np.testing.assert_allclose(out[..., :3], layer[..., :3] * 2.0, rtol=1e-5)
+
+
+def test_add_and_gamma():
+    layer = _layer()
+    out = reference.render([layer], [{GRADE: {"add": 0.5}}])
+    np.testing.assert_allclose(out[..., :3], layer[..., :3] + 0.5, rtol=1e-6)
+    out = reference.render([layer], [{GRADE: {"gamma": 2.0}}])
+    np.testing.assert_allclose(out[..., :3], np.sqrt(layer[..., :3]), rtol=1e-6)
+
+
+def test_black_clamp():
+    layer = _layer() - 1.0
+    clamped = reference.render([layer], [{GRADE: {"add": 0.0}}])
+    assert clamped[..., :3].min() == 0.0
+    settings = {grade: {"black_clamp": False} for grade in reference.GRADES}
+    out = reference.render([layer], [settings])
+    np.testing.assert_allclose(out, layer, rtol=1e-6)
+
+
+def test_white_clamp():
+    layer = _layer()
+    out = reference.render([layer], [{GRADE: {"white_clamp": True}}])
+    np.testing.assert_allclose(out[..., :3], np.minimum(layer[..., :3], 1.0))
+
+
+def test_chunked_matches_unchunked():
+    layers = [_layer(0, 32, 16), _layer(1, 32, 16), _layer(2, 32, 16)]
+    settings = [
+        {GRADE: {"multiply": 1.5, "gamma": 1.2}},
+        {COLOR_CORRECT: {"saturation": 0.5, "gain": 2.0}},
+        {reference.GRADES[1]: {"add": 0.1, "mix": 0.25}},
+    ]
+    assert reference.tile_rows(len(layers), 16, 4, max_bytes=1) == 1
+    whole = reference.render(layers, settings)
+    chunked = reference.render(layers, settings, max_bytes=1)
+    np.testing.assert_array_equal(chunked, whole)
+
+
+def test_render_checks_settings():
+    with pytest.raises(AttributeError):
+        reference.render([], [])
+    with pytest.raises(AttributeError):
+        reference.render([_layer()], [{}, {}])
@@ -0,0 +1,36 @@
+import nuke
+import pytest
+
+import relight_node
+from relight.model.spec import STATE_KNOB
+from relight_manager import Manager
+
+ROW = "Grade_0.multiply"
+
+
+@pytest.fixture(name="rig")
+def fixture_rig(group: nuke.Node) -> nuke.Node:
+    Manager().add_categories(["key_light", "rim_light"])
+    group.node("key_light_Grade_0")["multiply"].setValue(2.0)
+    return group
+
+
+@pytest.mark.parametrize("saved_state", [True, False])
+def test_snapshot(rig: nuke.Node, saved_state: bool):
+    if not saved_state:
+        rig[STATE_KNOB].setValue("")
+    snapshot = relight_node.snapshot(rig)
+    assert snapshot.categories == ("key_light", "rim_light")
+    assert snapshot.get("key_light", ROW) == (2.0,) * 4
+    assert snapshot.get("rim_light", ROW) == (1.0,) * 4
+
+
+@pytest.mark.parametrize("saved_state", [True, False])
+def test_apply_snapshot(rig: nuke.Node, saved_state: bool):
+    snapshot = relight_node.snapshot(rig)
+    snapshot.set("rim_light", ROW, 3.0)
+    if not saved_state:
+        rig[STATE_KNOB].setValue("")
+    assert relight_node.apply_snapshot(snapshot, [rig]) == 1
+    assert rig.node("rim_light_Grade_0")["multiply"].value() == [3.0] * 4
+    assert relight_node.apply_snapshot(snapshot, [rig]) == 0
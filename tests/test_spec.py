@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from relight.model.spec import STATE_VERSION, RigSpec, decode_state, encode_state
+
+
+def test_state_round_trip():
+    categories = {"rim_light": ["rim_light_Dot_0"], "key_light": ["key_light_Dot_0"]}
+    decoded = decode_state(encode_state(categories))
+    assert decoded == categories
+    assert list(decoded) == ["rim_light", "key_light"]
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "",
+        "not json",
+        "[]",
+        json.dumps({"version": STATE_VERSION + 1, "categories": []}),
+        json.dumps({"version": STATE_VERSION}),
+        json.dumps({"version": STATE_VERSION, "categories": None}),
+        json.dumps({"version": STATE_VERSION, "categories": {"key_light": []}}),
+        json.dumps({"version": STATE_VERSION, "categories": [["key_light"]]}),
+        json.dumps({"version": STATE_VERSION, "categories": [["key_light", "a"]]}),
+        json.dumps({"version": STATE_VERSION, "categories": [[1, ["a"]]]}),
+        json.dumps({"version": STATE_VERSION, "categories": [["key_light", [1]]]}),
+    ],
+)
+def test_invalid_state(value: str):
+    assert decode_state(value) is None
+
+
+def test_rig_spec():
+    spec = RigSpec.from_dict({"merge_mode": "tree", "categories": ["a", "b"]})
+    assert spec.categories == ("a", "b")
+    assert RigSpec.from_dict(spec.to_dict()) == spec
+    with pytest.raises(AttributeError):
+        RigSpec.from_dict({"merge_mode": "star"})